@@ -1,186 +1,211 @@
 import os
 import json
-import sys
-import httpx
-from typing import List
-
-from twitch.channel import Channel
-from datetime import datetime, timedelta
+import re
+import time
+import asyncio
+import logging
 import argparse
+from typing import Dict, Iterator, List, Tuple
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables, before the twitch modules read their settings on import
 load_dotenv()
 
+from twitch.core import check_env_vars, load_save_data, save_data
+from twitch.lazy import lazy_import
+from twitch.registry import ChannelRegistry
+from twitch.store import StateStore, open_state_store
+
+# The HTTP stack is only loaded once a channel is actually checked, so --help and typos return instantly
+httpx = lazy_import("httpx")
+helix = lazy_import("twitch.helix")
+client = lazy_import("twitch.client")
+ratelimit = lazy_import("twitch.ratelimit")
+auth = lazy_import("twitch.auth")
+
+# Plain messages on the console, like the rest of this script's output
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 CHANNEL_LIST_FILE: str = os.getenv("CHANNEL_LIST")
 SAVE_FILE: str = os.getenv("SAVE_FILE")
 CLIENT_ID: str = os.getenv("CLIENT_ID")
 AUTH_KEY: str = os.getenv("AUTH_KEY")
+SECRET: str = os.getenv("SECRET")  # Client secret, to get an app access token instead of a fixed AUTH_KEY
+KEY_EXPIRE: float = float(os.getenv("KEY_EXPIRE") or 0)  # Unix time AUTH_KEY expires, 0 if unknown
+LOGIN_PATTERN = re.compile(r"^[A-Za-z0-9_]{1,25}$")  # Anything else can't be a Twitch login
 
-def check_env_vars():
-    # List of required environment variables
-    required_vars = [
-        "CHANNEL_LIST",
-        "SAVE_FILE",
-        "AUTH_KEY",
-        "CLIENT_ID",
-    ]
+check_env_vars(["CHANNEL_LIST", "SAVE_FILE", "CLIENT_ID"] + ([] if SECRET else ["AUTH_KEY"]))
 
-    # Check for missing environment variables
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-
-    # If any environment variables are missing, print them and exit
-    if missing_vars:
-        print(f"Missing environment variables: {', '.join(missing_vars)}")
-        sys.exit(1)
-check_env_vars()
-
-
-
-
-# def is_live(channel_name: str) -> bool:
-#     """Check if the Twitch channel is live."""
-#     try:
-#         response = httpx.get(f"https://www.twitch.tv/{channel_name}")
-#         response.raise_for_status()
-#         return "isLiveBroadcast" in response.text
-#     except httpx.RequestError as exc:
-#         print(f"Request error for channel {channel_name}: {exc}")
-#     except httpx.HTTPStatusError as exc:
-#         print(f"HTTP error for channel {channel_name}: {exc.response.status_code}")
-#     except Exception as exc:
-#         print(f"Unexpected error while checking {channel_name}: {exc}")
-#     return False
-def is_live(channel_name: str) -> bool:
-    """Check if the Twitch channel is live."""
-    try:
-        
-        # response = await client.get(f"https://www.twitch.tv/{channel_name}")
-
-        headers = {"Client-ID": CLIENT_ID, "Authorization": f"Bearer {AUTH_KEY}"}
-
-        url = f"https://api.twitch.tv/helix/search/channels?query={channel_name}"
-        response = httpx.get(url=url, headers=headers)
-        response.raise_for_status()
-
-        # Parse the JSON response
-        data = response.json().get("data", [])
-
-        # Search for the channel in the response data
-        for channel in data:
-            if channel.get("broadcaster_login", "").lower() == channel_name.lower():
-                is_live = channel.get("is_live", None)
-                
-                if is_live is None:
-                    
-                    save_file_with_auto_dirs(
-                        channelname=channel_name, 
-                        content=channel, 
-                        status="null"
-                    )
-                return is_live
-        return None
-    except httpx.RequestError as exc:
-        
-        print(f"Request error for channel {channel_name}: {exc}")
-        return False
-    except httpx.HTTPStatusError as exc:
-        # log_error(exc)  # Log error with function name and line
-        print(
-            f"HTTP error for channel {channel_name}: {exc.response.status_code}"
-        )
-        return False
-    except Exception as exc:
-        # log_error(exc)  # Log error with function name and line
-        print(
-            f"An unexpected error occurred while checking the status of {channel_name}: {exc}"
-        )
-        return False
 
-def save_file_with_auto_dirs(channelname, content, status):
+def add_channel(channel_name: str, channels: ChannelRegistry, store: StateStore) -> None:
+    """Add a new channel to the registry and save it to the state store."""
+    if channel_name in channels:
+        print(f"Channel {channel_name} is already in the list.")
+        return
+    if not LOGIN_PATTERN.match(channel_name):
+        print(f"'{channel_name}' is not a valid Twitch login.")
+        return
+
     try:
-        # Extract the directory path
-        # Get the current time
-        now = datetime.now()
+        found = asyncio.run(check_names([channel_name]))
+    except (httpx.RequestError, httpx.HTTPStatusError, helix.CircuitOpenError) as e:
+        print(f"Could not check {channel_name}: {e}")
+        return
+    if channel_name not in found:
+        print(f"Channel {channel_name} is not a Twitch user.")
+        return
 
-        formatted_time = now.strftime("%Y.%m.%dT%H.%M.%S")
+    new_channel = channels.add_name(channel_name, live=found[channel_name])
+    save_data([new_channel], store)
+    print(f"Added new channel {channel_name}.")
 
-        outfile = f"{channelname}[{formatted_time}]({status}).json"
-        file_path = os.path.join("troubleshooting", "status-responses" ,channelname, outfile)
-        dir_path = os.path.dirname(file_path)
 
-        # Create the directories if they don't exist
-        os.makedirs(dir_path, exist_ok=True)
+async def check_names(names: List[str]) -> Dict[str, bool]:
+    """Check up to 100 names with a client of their own. Returns {channel_name: live} for the existing users."""
+    async with client.create_http_client() as http_client:
+        headers = await start_token_manager(http_client)
+        return await check_new_batch(http_client, headers, names, ratelimit.RateLimiter())
 
-        # Write the content to the file
-        # with open(file_path, "w") as file:
-        #     file.write(content)
-        # Write the content to the file
-        with open(file_path, "w") as file:
-            json.dump(content, file, indent=4)  # `content` must be a dictionary or list
 
-    except OSError as e:
-        print(f"OS error occurred while saving the file: {e}")
-        # print(f"Failed to save the file: {e}")
+async def start_token_manager(http_client: "httpx.AsyncClient") -> Dict[str, str]:
+    """The Helix headers, with a fresh token if SECRET is set. A rejected token is renewed once."""
+    token_manager = auth.TokenManager(CLIENT_ID, SECRET, AUTH_KEY, KEY_EXPIRE or None)
+    # No background refresh: a run is short, and a 401 renews the token anyway
+    await token_manager.start(http_client, background=False)
+    return token_manager.headers
 
-    except Exception as e:
-        print(f"Unexpected error occurred: {e}")
-        # print(f"An unexpected error occurred: {e}")
 
+def progress_path_for(file_path: str) -> str:
+    """Where the progress of importing `file_path` is kept, e.g. `channels.txt.progress.json`."""
+    return f"{file_path}.progress.json"
 
 
-def load_save_data(save_json_file: str) -> List[Channel]:
-    """Load channel statuses from a JSON file."""
+def load_progress(progress_path: str) -> dict:
+    """Load the progress of an interrupted import, or a fresh one."""
     try:
-        with open(save_json_file, "r") as json_file:
-            data = json.load(json_file)
-        channels = [
-            Channel(channel_data["name"], channel_data["live"]) for channel_data in data
-        ]
-        print(f"Loaded {len(channels)} channels from {save_json_file}.")
-        return channels
+        with open(progress_path, "r") as progress_file:
+            return json.load(progress_file)
     except FileNotFoundError:
-        print(f"No previous data found, starting fresh.")
-    except json.JSONDecodeError as je:
-        print(f"Error decoding JSON in {save_json_file}: {je}")
-    except Exception as e:
-        print(f"Error loading {save_json_file}: {e}")
-    return []  # Return empty list if anything goes wrong
-
-
-def save_channels(channels: List[Channel], save_json_file: str) -> None:
-    """Save the list of channels to a JSON file."""
-    try:
-        with open(save_json_file, "w") as json_file:
-            json.dump([channel.data() for channel in channels], json_file, indent=4)
-        print(f"Data saved successfully to {save_json_file}.")
-    except Exception as e:
-        print(f"Error saving data to {save_json_file}: {e}")
-
-
-def add_channel(channel_name: str, channels: List[Channel], save_json_file: str) -> None:
-    """Add a new channel to the list and save the updated list to the file."""
-    if any(channel.name == channel_name for channel in channels):
-        print(f"Channel {channel_name} is already in the list.")
-        return
-
-    new_channel = Channel(name=channel_name, live=is_live(channel_name))
-    channels.append(new_channel)
-    save_channels(channels, save_json_file)
-    print(f"Added new channel {channel_name}.")
-
+        return {"line": 0, "channels": {}, "invalid": 0}
+
+
+def save_progress(progress_path: str, progress: dict) -> None:
+    """Write the progress atomically, so an interrupted write never corrupts it."""
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w") as progress_file:
+        json.dump(progress, progress_file)
+    os.replace(tmp_path, progress_path)
+
+
+def read_channel_names(file_path: str, skip: int = 0) -> Iterator[Tuple[int, str]]:
+    """Stream (line number, channel name) pairs from `file_path`, starting after line `skip`."""
+    with open(file_path, "r") as file:
+        for line_number, line in enumerate(file, start=1):
+            if line_number > skip and line.strip():
+                yield line_number, line.strip()
+
+
+async def check_new_batch(
+    http_client: "httpx.AsyncClient", headers: Dict[str, str], batch: List[str], limiter: "ratelimit.RateLimiter"
+) -> Dict[str, bool]:
+    """
+    Validate a batch of at most 100 names against Helix /users and look up the live
+    state of the ones that exist.
+
+    Returns:
+        dict: {channel_name: live} for every name that is an existing Twitch user.
+    """
+    user_ids = await helix.fetch_user_ids(http_client, headers, batch, limiter)
+    known = {name: user_ids[name.lower()] for name in batch if name.lower() in user_ids}
+    if not known:
+        return {}
+    streams = await helix.fetch_streams(http_client, headers, user_ids=set(known.values()), limiter=limiter)
+    live_ids = {stream.get("user_id") for stream in streams if stream.get("type") == "live"}
+    return {name: user_id in live_ids for name, user_id in known.items()}
+
+
+async def import_channels(
+    file_path: str, channels: ChannelRegistry, store: StateStore, resume: bool = False, concurrency: int = 8
+) -> None:
+    """
+    Bulk import the channel names in `file_path`.
+
+    Names are streamed from the file in waves of `concurrency` batches of 100, each
+    batch validated and checked for its live state with two Helix requests, and the
+    batches of a wave run concurrently. Nothing is written to the state store until
+    the whole file has been checked, then every new channel is saved in a single
+    transaction.
+
+    After every wave the progress is written next to the file, so an interrupted
+    import can be continued with `resume=True` instead of starting over.
+    """
+    progress_path = progress_path_for(file_path)
+    if resume:
+        progress = load_progress(progress_path)
+        if progress["line"]:
+            print(f"Resuming {file_path} after line {progress['line']} ({len(progress['channels'])} channels already checked).")
+    else:
+        if os.path.exists(progress_path):
+            print(f"Discarding the progress of an earlier import of {file_path}, use --resume to continue it instead.")
+        progress = {"line": 0, "channels": {}, "invalid": 0}
+
+    limiter = ratelimit.RateLimiter()
+    wave_size = helix.MAX_BATCH_SIZE * max(1, concurrency)
+    checked = 0
+    started = time.monotonic()
+
+    async def run_wave(wave: List[str], last_line: int) -> None:
+        nonlocal checked
+        results = await asyncio.gather(*(check_new_batch(http_client, headers, batch, limiter) for batch in helix.chunked(wave)))
+        for found in results:
+            progress["channels"].update(found)
+        progress["invalid"] += len(wave) - sum(len(found) for found in results)
+        progress["line"] = last_line
+        save_progress(progress_path, progress)
+
+        checked += len(wave)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        live = sum(1 for is_channel_live in progress["channels"].values() if is_channel_live)
+        print(
+            f"Line {last_line}: {len(progress['channels'])} channels found ({live} live), "
+            f"{progress['invalid']} not found, {checked / elapsed:.0f} names/s."
+        )
 
-def add_many_channels(channel_names: List[str], channels: List[Channel], save_json_file: str) -> None:
-    """Add many new channels to the list and save the updated list to the file."""
-    for channel_name in channel_names:
-        if any(channel.name == channel_name for channel in channels):
-            print(f"Channel {channel_name} is already in the list.")
-            continue
-        new_channel = Channel(name=channel_name, live=is_live(channel_name))
-        channels.append(new_channel)
-    
-    save_channels(channels, save_json_file)
-    print(f"Added new channels to the list.")
+    async with client.create_http_client() as http_client:
+        headers = await start_token_manager(http_client)
+        wave: List[str] = []
+        pending = set(progress["channels"])
+        line_number = progress["line"]
+        try:
+            for line_number, channel_name in read_channel_names(file_path, skip=progress["line"]):
+                if channel_name in channels or channel_name in pending:
+                    continue
+                if not LOGIN_PATTERN.match(channel_name):
+                    print(f"Skipping '{channel_name}' on line {line_number}, it is not a valid Twitch login.")
+                    progress["invalid"] += 1
+                    continue
+                pending.add(channel_name)
+                wave.append(channel_name)
+                if len(wave) >= wave_size:
+                    await run_wave(wave, line_number)
+                    wave = []
+            if wave or line_number > progress["line"]:
+                await run_wave(wave, line_number)
+        except (httpx.RequestError, httpx.HTTPStatusError, helix.CircuitOpenError) as e:
+            print(f"Import of {file_path} stopped at line {progress['line']}: {e}")
+            print("Nothing was saved yet, run again with --resume to continue.")
+            return
+
+    new_channels = [
+        channels.add_name(channel_name, live=is_channel_live)
+        for channel_name, is_channel_live in progress["channels"].items()
+        if channel_name not in channels
+    ]
+    save_data(new_channels, store)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    elapsed = time.monotonic() - started
+    print(f"Imported {len(new_channels)} new channels from {file_path} in {elapsed:.1f} seconds.")
 
 
 # Create the parser
@@ -190,25 +215,28 @@ parser = argparse.ArgumentParser(description="Add a channel name to Twitch alert
 parser.add_argument("--file", type=str, help="Path to a file to read channel names to add")
 # Positional argument for a single channel
 parser.add_argument("--channel", type=str, help="Name of channel (not URL)")
+# Bulk import options
+parser.add_argument("--resume", action="store_true", help="Continue an interrupted --file import")
+parser.add_argument("--concurrency", type=int, default=8, help="Helix batches checked at the same time during --file imports")
 
 # Parse the arguments
 args = parser.parse_args()
 
-# Initialize channels from save file
-channels = load_save_data(SAVE_FILE)
+# Initialize channels from the state store, migrating a legacy JSON save file on first use
+store = open_state_store(SAVE_FILE)
+channels = load_save_data(store)
 
 # Handle single channel addition
 if args.channel:
-    add_channel(channel_name=args.channel, channels=channels, save_json_file=SAVE_FILE)
+    add_channel(channel_name=args.channel, channels=channels, store=store)
 
 # Handle file-based addition of channels
 if args.file:
     try:
-        with open(args.file, 'r') as file:
-            channel_names = [line.strip() for line in file.readlines() if line.strip()]
-            add_many_channels(channel_names=channel_names, channels=channels, save_json_file=SAVE_FILE)
+        asyncio.run(import_channels(args.file, channels=channels, store=store, resume=args.resume, concurrency=args.concurrency))
+    except KeyboardInterrupt:
+        print("Import interrupted, run again with --resume to continue.")
     except FileNotFoundError:
         print(f"Error: The file {args.file} was not found.")
     except Exception as e:
         print(f"Error reading file {args.file}: {str(e)}")
-
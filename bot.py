@@ -1,210 +1,108 @@
 import os
-import sys
-import json
-import time
-import httpx
 import asyncio
 import logging
-import traceback
 from datetime import datetime, timedelta
-from discord import SyncWebhook
 from dotenv import load_dotenv
 from typing import List
 
-
-from twitch.channel import Channel
-
-# Load environment variables
+# Load environment variables, before the twitch modules read their settings on import
 load_dotenv()
 
+from twitch import metrics
+from twitch.auth import TokenManager
+from twitch.client import create_http_client
+from twitch.core import check_env_vars, keep_start_history, load_channels, log_error, reload_channel_list, run_poll_cycle, save_data
+from twitch.dumps import DumpSink
+from twitch.enrich import Enricher
+from twitch.idcache import BroadcasterIdCache
+from twitch.logs import DETAIL_LOG_LEVEL, LOG_FORMAT, setup_logging
+from twitch.ratelimit import RateLimiter
+from twitch.routes import create_router
+from twitch.scheduler import PollScheduler
+from twitch.sharding import HashRing, parse_workers, shard_save_file
+from twitch.store import open_state_store
+from twitch.watcher import FileWatcher
+
 # Constants
 CHANNEL_LIST_FILE: str = os.getenv("CHANNEL_LIST")
 UPDATE_DELAY: float = float(os.getenv("UPDATE_DELAY_MIN", 1)) * 60  # Convert to seconds
 DISCORD_WEBHOOK_URL: str = os.getenv("DISCORD_WEBHOOK_URL")
 TWITCH_ROLE_ID: str = os.getenv("TWITCH_ROLE_ID")
+ROUTES_FILE: str = os.getenv("ROUTES_FILE")  # JSON file of Discord routes, replaces DISCORD_WEBHOOK_URL and TWITCH_ROLE_ID
 SAVE_FILE: str = os.getenv("SAVE_FILE")
 CLIENT_ID: str = os.getenv("CLIENT_ID")
 AUTH_KEY: str = os.getenv("AUTH_KEY")
+SECRET: str = os.getenv("SECRET")  # Client secret, to get and renew app access tokens instead of a fixed AUTH_KEY
+KEY_EXPIRE: float = float(os.getenv("KEY_EXPIRE") or 0)  # Unix time AUTH_KEY expires, 0 if unknown
+WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))  # Max Discord messages waiting to be sent
+WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+POLL_CONCURRENCY: int = int(os.getenv("POLL_CONCURRENCY", 8))  # Max Helix requests in flight per cycle
+CYCLE_DEADLINE: float = float(os.getenv("CYCLE_DEADLINE_SEC", UPDATE_DELAY))  # Seconds before unfinished checks are dropped
+POLL_FAST: float = float(os.getenv("POLL_FAST_MIN", UPDATE_DELAY / 2 / 60)) * 60  # Live channels and usual start times
+POLL_MAX: float = float(os.getenv("POLL_MAX_MIN", UPDATE_DELAY * 10 / 60)) * 60  # Ceiling for dormant channels
+POLL_BACKOFF: float = float(os.getenv("POLL_BACKOFF", 1.5))  # Interval growth per offline check
+HELIX_REQUESTS_PER_MINUTE: float = float(os.getenv("HELIX_REQUESTS_PER_MINUTE", 600))  # Global polling budget
+MIN_TICK: float = 1.0  # Shortest sleep between scheduler ticks
+SHARD_WORKERS: List[str] = parse_workers(os.getenv("SHARD_WORKERS"))  # All workers sharing CHANNEL_LIST
+SHARD_ID: str = os.getenv("SHARD_ID")  # This worker's name in SHARD_WORKERS
+WATCH_CHANNEL_LIST: bool = os.getenv("WATCH_CHANNEL_LIST", "true").strip().lower() in ("1", "true", "yes")  # Apply edits to CHANNEL_LIST while running
+RICH_ALERTS: bool = os.getenv("RICH_ALERTS", "true").strip().lower() in ("1", "true", "yes")  # Live alerts as embeds with title, game and thumbnail
+METRICS_PORT: int = int(os.getenv("METRICS_PORT", 0))  # Serve Prometheus metrics on this port, 0 to disable
 
 
 # Set up logging
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)  # You can change this to DEBUG for more detailed logs
 
-# Create handlers for logging to both the console and a file
+# Log to the console and a rotating LOG_FILE, from a background thread fed by a queue
 console_handler = logging.StreamHandler()
-file_handler = logging.FileHandler("twitch_bot.log")
-
-# Set the log format
-formatter = logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s")
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
-
-# Add the handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+log_listener = setup_logging([console_handler], level=logging.INFO)  # You can change this to DEBUG for more detailed logs
 
 
-def check_env_vars():
-    # List of required environment variables
-    required_vars = [
-        "DISCORD_WEBHOOK_URL",
-        "TWITCH_ROLE_ID",
+check_env_vars(
+    # With ROUTES_FILE every route brings its own webhook and role
+    ([] if ROUTES_FILE else ["DISCORD_WEBHOOK_URL", "TWITCH_ROLE_ID"]) + [
         "CHANNEL_LIST",
         "UPDATE_DELAY_MIN",
         "SAVE_FILE",
-        "AUTH_KEY",
         "CLIENT_ID",
-    ]
-
-    # Check for missing environment variables
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-
-    # If any environment variables are missing, print them and exit
-    if missing_vars:
-        logger.error(f"Missing environment variables: {', '.join(missing_vars)}")
-        sys.exit(1)
-
-
-check_env_vars()
-
-
-def log_error(e: Exception):
-    """Logs detailed error information including function and line number."""
-    exc_type, exc_value, exc_tb = e.__class__, e, e.__traceback__
-    # Format the traceback into a readable string
-    tb_lines = traceback.format_exception(exc_type, exc_value, exc_tb)
-    # Log the error with the function name and line number
-    logger.error("".join(tb_lines))
-
-
-def save_file_with_auto_dirs(channelname, content, status):
-    try:
-        # Extract the directory path
-        # Get the current time
-        now = datetime.now()
-
-        formatted_time = now.strftime("%Y.%m.%dT%H.%M.%S")
-
-        outfile = f"{channelname}[{formatted_time}]({status}).json"
-        file_path = os.path.join("troubleshooting", "status-responses" ,channelname, outfile)
-        dir_path = os.path.dirname(file_path)
-
-        # Create the directories if they don't exist
-        os.makedirs(dir_path, exist_ok=True)
-
-        # Write the content to the file
-        # with open(file_path, "w") as file:
-        #     file.write(content)
-        # Write the content to the file
-        with open(file_path, "w") as file:
-            json.dump(content, file, indent=4)  # `content` must be a dictionary or list
-
-    except OSError as e:
-        logging.error(f"OS error occurred while saving the file: {e}")
-        # print(f"Failed to save the file: {e}")
-
-    except Exception as e:
-        logging.error(f"Unexpected error occurred: {e}")
-        # print(f"An unexpected error occurred: {e}")
-
-
-async def is_live(channel_name: str) -> bool:
-    """Check if the Twitch channel is live."""
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Client-ID": CLIENT_ID, "Authorization": f"Bearer {AUTH_KEY}"}
-            url = f"https://api.twitch.tv/helix/search/channels?query={channel_name}"
-            
-            # Retry logic in case of transient issues
-            for attempt in range(3):  # Retry up to 3 times
-                try:
-                    response = await client.get(url=url, headers=headers, timeout=10.0)
-                    response.raise_for_status()
-                    break  # If successful, exit retry loop
-                except (httpx.ConnectError, httpx.ReadTimeout) as exc:
-                    logger.warning(f"Attempt {attempt + 1}: Connection issue: {exc}")
-                    if attempt < 2:  # If not the last attempt, wait and retry
-                        await asyncio.sleep(2 ** attempt)
-                    else:
-                        raise  # After 3 attempts, raise the exception
-            
-            # Parse the JSON response
-            data = response.json().get("data", [])
-
-            # Search for the channel in the response data
-            for channel in data:
-                if channel.get("broadcaster_login", "").lower() == channel_name.lower():
-                    is_live = channel.get("is_live", None)
-                    
-                    if is_live is None:
-                        save_file_with_auto_dirs(
-                            channelname=channel_name, 
-                            content=channel, 
-                            status="null"
-                        )
-                    return is_live
-
-        return False  # If the channel wasn't found
-    except httpx.RequestError as exc:
-        logger.error(f"Request error for channel '{channel_name}': {exc}")
-        return False
-    except httpx.HTTPStatusError as exc:
-        logger.error(
-            f"HTTP status error for channel '{channel_name}': {exc.response.status_code}, {exc.response.text}"
-        )
-        return False
-    except Exception as exc:
-        logger.error(
-            f"Unexpected error while checking the status of '{channel_name}': {exc}"
-        )
-        return False
-
-
-
-def get_channels(filename: str) -> List[str]:
-    """Read a list of streamers from a file."""
-    try:
-        with open(filename, "r") as f:
-            streamers = [line.strip() for line in f if line.strip()]
-            logger.info(f"Loaded {len(streamers)} streamers from {filename}.")
-            return streamers
-    except FileNotFoundError as e:
-        log_error(e)  # Log error with function name and line
-        logger.error(f"Error: The file {filename} does not exist.")
-        return []
-    except Exception as e:
-        log_error(e)  # Log error with function name and line
-        logger.error(f"An unexpected error occurred while reading {filename}: {e}")
-        return []
-
-
-def send_webhook(channel_name: str, status: str) -> None:
-    """Send a webhook notification to Discord."""
+    ] + ([] if SECRET else ["AUTH_KEY"]),  # With SECRET the token is fetched and renewed
+    shard_workers=SHARD_WORKERS,
+    shard_id=SHARD_ID,
+)
+
+# App access token shared by every Helix request, renewed before it expires
+token_manager = TokenManager(CLIENT_ID, SECRET, AUTH_KEY, KEY_EXPIRE or None)
+# Profile images and game box art for rich alerts, cached across cycles
+enricher = Enricher()
+# Shared Helix rate limiter, paced by the Ratelimit-* headers of every response
+rate_limiter = RateLimiter()
+# Per-channel poll schedule: live channels more often, dormant ones backing off
+scheduler = PollScheduler(
+    base_interval=UPDATE_DELAY,
+    fast_interval=POLL_FAST,
+    max_interval=POLL_MAX,
+    backoff=POLL_BACKOFF,
+    requests_per_minute=HELIX_REQUESTS_PER_MINUTE,
+)
+# Sharded mode: this worker owns a consistent-hash slice of CHANNEL_LIST and keeps its own state files
+hash_ring = HashRing(SHARD_WORKERS) if SHARD_WORKERS else None
+STATE_FILE: str = shard_save_file(SAVE_FILE, SHARD_ID) if hash_ring else SAVE_FILE
+# Persistent login -> broadcaster_id map, stored alongside the state
+id_cache = BroadcasterIdCache(BroadcasterIdCache.path_for(STATE_FILE))
+# Channel states, migrated once from a legacy JSON save file
+state_store = open_state_store(STATE_FILE)
+# Discord routes: every channel's transitions go to each webhook subscribed to it
+router = create_router(ROUTES_FILE, DISCORD_WEBHOOK_URL, TWITCH_ROLE_ID)
+# Unexpected Helix responses are written off the event loop, batched and compressed
+dump_sink = DumpSink()
+
+
+async def countdown(seconds: float) -> None:
+    """Sleep for the given number of seconds without blocking the event loop."""
     try:
-        detect_time = int(time.time())
-        webhook = SyncWebhook.from_url(DISCORD_WEBHOOK_URL)
-
-        live_message = f"<@&{TWITCH_ROLE_ID}> <t:{detect_time}:F> <t:{detect_time}:R> - [{channel_name}]({'https://www.twitch.tv/'+channel_name}) is {status}!"
-
-        # live_message = f"<@&{TWITCH_ROLE_ID}> <t:{detect_time}> <t:{detect_time}:R> - {channel_name} is {status}!"
-
-        offline_message = f"<@&{TWITCH_ROLE_ID}> <t:{detect_time}> <t:{detect_time}:R> - {channel_name} is {status}!"
-
-        message = live_message if status == "live" else offline_message
-        webhook.send(message)
-
-        logger.info(f"Sent {status} status for {channel_name} to Discord.")
-    except Exception as e:
-        log_error(e)  # Log error with function name and line
-        logger.error(f"Failed to send webhook for {channel_name}: {e}")
-
-
-def countdown(seconds: float) -> None:
-    """Sleep for the given number of seconds."""
-    try:
-        logger.info(f"Waiting for {seconds} seconds before the next update...")
-        time.sleep(seconds)
+        logger.log(DETAIL_LOG_LEVEL, f"Waiting for {seconds} seconds before the next update...")
+        await asyncio.sleep(seconds)
     except Exception as e:
         log_error(e)  # Log error with function name and line
         logger.error(f"Error in countdown function: {e}")
@@ -241,102 +139,72 @@ def update_time():
 
 
 
-def save_data(channels: List[Channel], save_json_file: str) -> None:
-    """Save the current channel statuses to a JSON file."""
-    try:
-        # data = {
-        #     "meta": {"saved": time.time()},
-        #     "channels": [channel.data() for channel in channels],
-        # }
-        with open(save_json_file, "w") as json_file:
-            json.dump([channel.data() for channel in channels], json_file, indent=4)
-        logger.info(f"Data saved successfully to {save_json_file}.")
-    except Exception as e:
-        log_error(e)  # Log error with function name and line
-        logger.error(f"Error saving data to {save_json_file}: {e}")
-
-
-def load_save_data(save_json_file: str) -> List[Channel]:
-    """Load channel statuses from a JSON file."""
-    try:
-        with open(save_json_file, "r") as json_file:
-            data = json.load(json_file)
-
-        channels = [
-            Channel(channel_data["name"], channel_data["live"]) for channel_data in data
-        ]
-
-        logger.info(f"Loaded {len(channels)} channels from {save_json_file}.")
-        return channels
-    except FileNotFoundError as e:
-        # log_error(e)  # Log error with function name and line
-        logger.warning(f"No previous data found, starting fresh.")
-        return []  # If no previous save exists, return an empty list
-
-    except json.JSONDecodeError as je:
-        # log_error(je)
-        logger.error(
-            f"An unexpected error occurred while decoding {save_json_file}: {je}"
-        )
-        return []
-
-    except Exception as e:
-        log_error(e)  # Log error with function name and line
-        logger.error(
-            f"An unexpected error occurred while loading {save_json_file}: {e}"
-        )
-        return []
-
-
 async def main():
     """Main function to monitor live Twitch channels."""
     try:
-        channels = load_save_data(SAVE_FILE)
-
-        if not channels:
-            channels = [
-                Channel(name=channel) for channel in get_channels(CHANNEL_LIST_FILE)
-            ]
-
-        while True:
-            for channel in channels:
-
-                if not channel:
-                    continue
-
-                is_channel_live = await is_live(channel.name)
-    
-                if is_channel_live is None:
-                    logger.info(f"{channel.name}'s channel status not found!")
-                    continue
-
-                if is_channel_live and not channel.live: # channel is live
-                    logger.info(f"{channel.name} is now live!")
-                    channel.set_live()
-                    send_webhook(channel.name, "live")
-                elif is_channel_live and channel.live: # Channel is already live
-                    logger.info(f"{channel.name} is live.")
-
-                elif not is_channel_live and channel.live: # channel becomes offline
-                    logger.info(f"{channel.name} is now offline!")
-                    channel.set_offline()
-                    send_webhook(channel.name, "offline")
-
-                elif not is_channel_live and not channel.live: # channel was already off
-                    logger.info(f"{channel.name} is offline.")
-
-
-            save_data(channels, SAVE_FILE)
-            logger.info(f"Waiting for {UPDATE_DELAY} seconds before the next check...")
-            countdown(UPDATE_DELAY)
-
-            
+        channels = load_channels(state_store, CHANNEL_LIST_FILE, hash_ring, SHARD_ID, SAVE_FILE)
+        router.log_coverage(channels.names(), all_monitored=not hash_ring)
+
+        id_cache.load()
+
+        for channel in channels:
+            scheduler.add(channel.name, live=channel.live)
+        keep_start_history(scheduler, state_store)
+
+        channel_list_watcher = FileWatcher(CHANNEL_LIST_FILE) if WATCH_CHANNEL_LIST else None
+        if channel_list_watcher:
+            logger.info(f"Watching {CHANNEL_LIST_FILE} for changes ({channel_list_watcher.mode}).")
+
+        dump_sink.start()
+        metrics.HELIX_BUDGET_REMAINING.set_function(lambda: rate_limiter.budget()["remaining"])
+        metrics.POLL_OVERDUE.set_function(scheduler.overdue)
+
+        # One pooled client for the lifetime of the bot, shared by Twitch and Discord requests
+        async with create_http_client() as client:
+            router.start(client, maxsize=WEBHOOK_QUEUE_SIZE, max_attempts=WEBHOOK_MAX_ATTEMPTS)
+            metrics.WEBHOOK_QUEUE_DEPTH.set_function(router.queue_depth)
+            metrics_server = await metrics.start_http_server(METRICS_PORT) if METRICS_PORT else None
+            try:
+                await token_manager.start(client)
+                while True:
+                    # Between cycles, so no channel is removed while it is being checked
+                    if channel_list_watcher and channel_list_watcher.changed():
+                        reload_channel_list(channels, CHANNEL_LIST_FILE, scheduler, state_store, hash_ring, SHARD_ID, SAVE_FILE)
+
+                    await run_poll_cycle(
+                        client,
+                        channels,
+                        scheduler,
+                        state_store,
+                        router,
+                        headers=token_manager.headers,
+                        id_cache=id_cache,
+                        limiter=rate_limiter,
+                        enricher=enricher if RICH_ALERTS else None,
+                        on_anomaly=dump_sink.record,
+                        client_id=CLIENT_ID,
+                        auth_key=AUTH_KEY,
+                        concurrency=POLL_CONCURRENCY,
+                        deadline=CYCLE_DEADLINE,
+                    )
+
+                    # Sleep until the next channel is due, waking at least once per UPDATE_DELAY
+                    next_due = scheduler.seconds_until_next()
+                    await countdown(max(MIN_TICK, min(UPDATE_DELAY, next_due if next_due is not None else UPDATE_DELAY)))
+            finally:
+                if metrics_server:
+                    metrics_server.close()
+                if channel_list_watcher:
+                    channel_list_watcher.close()
+                await token_manager.stop()
+                await router.stop()
+                dump_sink.close()
 
     except KeyboardInterrupt:
         logger.info("Process interrupted by user. Saving data and exiting...")
         save = input("save current data [Y/n]:")
         if not save:
-            save_data(channels, SAVE_FILE)
+            save_data(channels, state_store)
         exit()
     except Exception as e:
         log_error(e)  # Log error with function name and line
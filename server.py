@@ -1,38 +1,74 @@
 import os
-import sys
-import json
 import time
 import httpx
 import asyncio
 import logging
-import traceback
-from datetime import datetime, timedelta
-from fastapi import FastAPI, BackgroundTasks
-from discord import SyncWebhook
+from fastapi import FastAPI, BackgroundTasks, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Optional
+
+# Load environment variables, before the twitch modules read their settings on import
+load_dotenv()
+
+from twitch import codec, core, metrics
+from twitch.auth import TokenManager
 from twitch.channel import Channel
+from twitch.client import create_http_client
+from twitch.core import check_env_vars, keep_start_history, load_channels, log_error, run_poll_cycle, save_data
+from twitch.dumps import DumpSink
+from twitch.enrich import Enricher
+from twitch.events import EventBroker
+from twitch import eventsub
+from twitch.helix import HELIX_BREAKER
+from twitch.idcache import BroadcasterIdCache
+from twitch.logs import setup_logging
+from twitch.ratelimit import RateLimiter
+from twitch.registry import ChannelRegistry, etag_matches
+from twitch.routes import create_router
+from twitch.scheduler import PollScheduler
+from twitch.sharding import HashRing, parse_workers, shard_save_file
+from twitch.store import open_state_store
+from twitch.watcher import FileWatcher
 import colorlog
 import threading
 
-# Load environment variables
-load_dotenv()
-
 # Constants
 CHANNEL_LIST_FILE: str = os.getenv("CHANNEL_LIST")
 UPDATE_DELAY: float = float(os.getenv("UPDATE_DELAY_MIN", 1)) * 60  # Convert to seconds
 DISCORD_WEBHOOK_URL: str = os.getenv("DISCORD_WEBHOOK_URL")
 TWITCH_ROLE_ID: str = os.getenv("TWITCH_ROLE_ID")
+ROUTES_FILE: str = os.getenv("ROUTES_FILE")  # JSON file of Discord routes, replaces DISCORD_WEBHOOK_URL and TWITCH_ROLE_ID
 SAVE_FILE: str = os.getenv("SAVE_FILE")
 CLIENT_ID: str = os.getenv("CLIENT_ID")
 AUTH_KEY: str = os.getenv("AUTH_KEY")
+SECRET: str = os.getenv("SECRET")  # Client secret, to get and renew app access tokens instead of a fixed AUTH_KEY
+KEY_EXPIRE: float = float(os.getenv("KEY_EXPIRE") or 0)  # Unix time AUTH_KEY expires, 0 if unknown
+WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))  # Max Discord messages waiting to be sent
+WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+POLL_CONCURRENCY: int = int(os.getenv("POLL_CONCURRENCY", 8))  # Max Helix requests in flight per cycle
+CYCLE_DEADLINE: float = float(os.getenv("CYCLE_DEADLINE_SEC", UPDATE_DELAY))  # Seconds before unfinished checks are dropped
+EVENTSUB_CALLBACK_URL: str = os.getenv("EVENTSUB_CALLBACK_URL")  # Public URL of POST /eventsub, enables EventSub
+EVENTSUB_SECRET: str = os.getenv("EVENTSUB_SECRET")
+EVENTSUB_ENABLED: bool = bool(EVENTSUB_CALLBACK_URL and EVENTSUB_SECRET)
+# With EventSub pushing changes, polling only reconciles missed notifications
+RECONCILE_DELAY: float = float(os.getenv("RECONCILE_DELAY_MIN", 15)) * 60
+POLL_DELAY: float = RECONCILE_DELAY if EVENTSUB_ENABLED else UPDATE_DELAY  # Base interval of every channel
+# EventSub already pushes changes, so there is no point polling live channels faster
+POLL_FAST: float = POLL_DELAY if EVENTSUB_ENABLED else float(os.getenv("POLL_FAST_MIN", UPDATE_DELAY / 2 / 60)) * 60
+POLL_MAX: float = float(os.getenv("POLL_MAX_MIN", POLL_DELAY * 10 / 60)) * 60  # Ceiling for dormant channels
+POLL_BACKOFF: float = float(os.getenv("POLL_BACKOFF", 1.5))  # Interval growth per offline check
+HELIX_REQUESTS_PER_MINUTE: float = float(os.getenv("HELIX_REQUESTS_PER_MINUTE", 600))  # Global polling budget
+MIN_TICK: float = 1.0  # Shortest sleep between scheduler ticks
+SHARD_WORKERS: List[str] = parse_workers(os.getenv("SHARD_WORKERS"))  # All workers sharing CHANNEL_LIST
+SHARD_ID: str = os.getenv("SHARD_ID")  # This worker's name in SHARD_WORKERS
+RICH_ALERTS: bool = os.getenv("RICH_ALERTS", "true").strip().lower() in ("1", "true", "yes")  # Live alerts as embeds with title, game and thumbnail
+WATCH_CHANNEL_LIST: bool = os.getenv("WATCH_CHANNEL_LIST", "true").strip().lower() in ("1", "true", "yes")  # Apply edits to CHANNEL_LIST while running
 
 # Set up logging
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
 
 console_handler = colorlog.StreamHandler()
-file_handler = logging.FileHandler("twitch_bot.log")
 
 formatter = colorlog.ColoredFormatter(
     "%(log_color)s%(asctime)s [%(levelname)s] - %(message)s",
@@ -49,10 +85,9 @@ formatter = colorlog.ColoredFormatter(
 )
 
 console_handler.setFormatter(formatter)
-file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s"))
 
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+# Console and rotating LOG_FILE output run on a background thread fed by a queue
+log_listener = setup_logging([console_handler], level=logging.INFO)
 
 # Add custom log level for Discord messages
 DISCORD_LOG_LEVEL = 25  # Custom log level between INFO (20) and WARNING (30)
@@ -64,172 +99,156 @@ def discord_log(self, message, *args, **kws):
 
 logging.Logger.discord = discord_log
 
-def check_env_vars():
-    required_vars = [
-        "DISCORD_WEBHOOK_URL", "TWITCH_ROLE_ID", "CHANNEL_LIST",
-        "UPDATE_DELAY_MIN", "SAVE_FILE", "AUTH_KEY", "CLIENT_ID"
-    ]
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-    if missing_vars:
-        logger.error(f"Missing environment variables: {', '.join(missing_vars)}")
-        sys.exit(1)
-
-check_env_vars()
-
-def log_error(e: Exception):
-    exc_type, exc_value, exc_tb = e.__class__, e, e.__traceback__
-    tb_lines = traceback.format_exception(exc_type, exc_value, exc_tb)
-    logger.error("".join(tb_lines))
-
-def save_file_with_auto_dirs(channelname, content, status):
-    try:
-        now = datetime.now()
-        formatted_time = now.strftime("%Y.%m.%dT%H.%M.%S")
-        outfile = f"{channelname}[{formatted_time}]({status}).json"
-        file_path = os.path.join("troubleshooting", "status-responses", channelname, outfile)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w") as file:
-            json.dump(content, file, indent=4)
-    except OSError as e:
-        logger.error(f"OS error occurred while saving the file: {e}")
-    except Exception as e:
-        logger.error(f"Unexpected error occurred: {e}")
-
-async def is_live(channel_name: str) -> bool:
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Client-ID": CLIENT_ID, "Authorization": f"Bearer {AUTH_KEY}"}
-            url = f"https://api.twitch.tv/helix/search/channels?query={channel_name}"
-            for attempt in range(3):
-                try:
-                    response = await client.get(url=url, headers=headers, timeout=10.0)
-                    response.raise_for_status()
-                    break
-                except (httpx.ConnectError, httpx.ReadTimeout) as exc:
-                    logger.warning(f"Attempt {attempt + 1}: Connection issue: {exc}")
-                    if attempt < 2:
-                        await asyncio.sleep(2 ** attempt)
-                    else:
-                        raise
-            data = response.json().get("data", [])
-            for channel in data:
-                if channel.get("broadcaster_login", "").lower() == channel_name.lower():
-                    is_live = channel.get("is_live", None)
-                    if is_live is None:
-                        save_file_with_auto_dirs(channelname=channel_name, content=channel, status="null")
-                    return is_live
-        return False
-    except httpx.RequestError as exc:
-        logger.error(f"Request error for channel '{channel_name}': {exc}")
-        return False
-    except httpx.HTTPStatusError as exc:
-        logger.error(f"HTTP status error for channel '{channel_name}': {exc.response.status_code}, {exc.response.text}")
-        return False
-    except Exception as exc:
-        logger.error(f"Unexpected error while checking the status of '{channel_name}': {exc}")
-        return False
-
-def get_channels(filename: str) -> List[str]:
-    try:
-        with open(filename, "r") as f:
-            streamers = [line.strip() for line in f if line.strip()]
-            logger.info(f"Loaded {len(streamers)} streamers from {filename}.")
-            return streamers
-    except FileNotFoundError as e:
-        log_error(e)
-        logger.error(f"Error: The file {filename} does not exist.")
-        return []
-    except Exception as e:
-        log_error(e)
-        logger.error(f"An unexpected error occurred while reading {filename}: {e}")
-        return []
+check_env_vars(
+    # With ROUTES_FILE every route brings its own webhook and role
+    ([] if ROUTES_FILE else ["DISCORD_WEBHOOK_URL", "TWITCH_ROLE_ID"])
+    + ["CHANNEL_LIST", "UPDATE_DELAY_MIN", "SAVE_FILE", "CLIENT_ID"]
+    + ([] if SECRET else ["AUTH_KEY"]),  # With SECRET the token is fetched and renewed
+    shard_workers=SHARD_WORKERS,
+    shard_id=SHARD_ID,
+)
 
-def send_webhook(channel_name: str, status: str) -> None:
+# App access token shared by every Helix request, renewed before it expires
+token_manager = TokenManager(CLIENT_ID, SECRET, AUTH_KEY, KEY_EXPIRE or None)
+# Pushes transitions and cycle summaries to GET /events clients
+event_broker = EventBroker()
+# Profile images and game box art for rich alerts, cached across cycles
+enricher = Enricher()
+# Shared Helix rate limiter, paced by the Ratelimit-* headers of every response
+rate_limiter = RateLimiter()
+# Per-channel poll schedule: live channels more often, dormant ones backing off
+scheduler = PollScheduler(
+    base_interval=POLL_DELAY,
+    fast_interval=POLL_FAST,
+    max_interval=POLL_MAX,
+    backoff=POLL_BACKOFF,
+    requests_per_minute=HELIX_REQUESTS_PER_MINUTE,
+)
+# Sharded mode: this worker owns a consistent-hash slice of CHANNEL_LIST and keeps its own state files
+hash_ring = HashRing(SHARD_WORKERS) if SHARD_WORKERS else None
+STATE_FILE: str = shard_save_file(SAVE_FILE, SHARD_ID) if hash_ring else SAVE_FILE
+# Persistent login -> broadcaster_id map, stored alongside the state
+id_cache = BroadcasterIdCache(BroadcasterIdCache.path_for(STATE_FILE))
+# Channel states, migrated once from a legacy JSON save file
+state_store = open_state_store(STATE_FILE)
+# Discord routes: every channel's transitions go to each webhook subscribed to it
+router = create_router(ROUTES_FILE, DISCORD_WEBHOOK_URL, TWITCH_ROLE_ID)
+# Unexpected Helix responses are written off the event loop, batched and compressed
+dump_sink = DumpSink()
+
+def publish_status(channel: Channel, live: bool, started_at: Optional[str] = None) -> None:
+    """Tell the GET /events clients that `channel` went live or offline."""
+    data = {"channel": channel.name, "live": live, "time": int(time.time())}
+    if live:
+        data["started_at"] = started_at
+    event_broker.publish("status", data)
+
+async def sync_eventsub_subscriptions():
     try:
-        detect_time = int(time.time())
-        webhook = SyncWebhook.from_url(DISCORD_WEBHOOK_URL)
-
-
-        live_message = f"<@&{TWITCH_ROLE_ID}> <t:{detect_time}:F> <t:{detect_time}:R> - [{channel_name}]({'https://www.twitch.tv/'+channel_name}) is {status}!"
-        
-        offline_message = f"<@&{TWITCH_ROLE_ID}> <t:{detect_time}> <t:{detect_time}:R> - {channel_name} is {status}!"
-
-        message = live_message if status == "live" else offline_message
-
-        webhook.send(message)
-        logger.discord(f"Sent {status} status for {channel_name} to Discord.")
+        await eventsub.sync_subscriptions(
+            http_client,
+            token_manager.headers,
+            channels.names(),
+            callback_url=EVENTSUB_CALLBACK_URL,
+            secret=EVENTSUB_SECRET,
+            limiter=rate_limiter,
+            id_cache=id_cache,
+        )
     except Exception as e:
         log_error(e)
-        logger.error(f"Failed to send webhook for {channel_name}: {e}")
+        logger.error(f"Failed to sync EventSub subscriptions, relying on polling: {e}")
 
-def save_data(channels: List[Channel], save_json_file: str) -> None:
+async def remove_eventsub_subscriptions(channel_names: List[str]):
     try:
-        with open(save_json_file, "w") as json_file:
-            json.dump([channel.data() for channel in channels], json_file, indent=4)
-        logger.info(f"Data saved successfully to {save_json_file}.")
+        await eventsub.remove_subscriptions(
+            http_client,
+            token_manager.headers,
+            channel_names,
+            callback_url=EVENTSUB_CALLBACK_URL,
+            limiter=rate_limiter,
+            id_cache=id_cache,
+        )
     except Exception as e:
         log_error(e)
-        logger.error(f"Error saving data to {save_json_file}: {e}")
+        logger.error(f"Failed to delete the EventSub subscriptions of removed channels: {e}")
 
-def load_save_data(save_json_file: str) -> List[Channel]:
-    try:
-        with open(save_json_file, "r") as json_file:
-            data = json.load(json_file)
-        channels = [Channel(channel_data["name"], channel_data["live"]) for channel_data in data]
-        logger.info(f"Loaded {len(channels)} channels from {save_json_file}.")
-        return channels
-    except FileNotFoundError:
-        logger.warning(f"No previous data found, starting fresh.")
-        return []
-    except json.JSONDecodeError as je:
-        logger.error(f"An unexpected error occurred while decoding {save_json_file}: {je}")
-        return []
-    except Exception as e:
-        log_error(e)
-        logger.error(f"An unexpected error occurred while loading {save_json_file}: {e}")
-        return []
+def reload_channel_list() -> None:
+    added, removed = core.reload_channel_list(channels, CHANNEL_LIST_FILE, scheduler, state_store, hash_ring, SHARD_ID, SAVE_FILE)
+    if added and EVENTSUB_ENABLED:
+        asyncio.create_task(sync_eventsub_subscriptions())
+    # The ring is fixed while running, so these left CHANNEL_LIST rather than moved to another worker
+    if removed and EVENTSUB_ENABLED:
+        asyncio.create_task(remove_eventsub_subscriptions([channel.name for channel in removed]))
 
 async def monitor_channels():
     global channels
-    channels = load_save_data(SAVE_FILE)
-    if not channels:
-        channels = [Channel(name=channel) for channel in get_channels(CHANNEL_LIST_FILE)]
+    channels = load_channels(state_store, CHANNEL_LIST_FILE, hash_ring, SHARD_ID, SAVE_FILE)
+    router.log_coverage(channels.names(), all_monitored=not hash_ring)
+    id_cache.load()
+    if EVENTSUB_ENABLED:
+        asyncio.create_task(sync_eventsub_subscriptions())
+    for channel in channels:
+        scheduler.add(channel.name, live=channel.live)
+    keep_start_history(scheduler, state_store)
+    channel_list_watcher = FileWatcher(CHANNEL_LIST_FILE) if WATCH_CHANNEL_LIST else None
     while True:
-        for channel in channels:
-            if not channel:
-                continue
-            is_channel_live = await is_live(channel.name)
-            if is_channel_live is None:
-                logger.info(f"{channel.name}'s channel status not found!")
-                continue
-            if is_channel_live and not channel.live:
-                logger.info(f"{channel.name} is now live!")
-                channel.set_live()
-                send_webhook(channel.name, "live")
-            elif is_channel_live and channel.live:
-                logger.info(f"{channel.name} is live.")
-            elif not is_channel_live and channel.live:
-                logger.info(f"{channel.name} is now offline!")
-                channel.set_offline()
-                send_webhook(channel.name, "offline")
-            elif not is_channel_live and not channel.live:
-                logger.info(f"{channel.name} is offline.")
-        save_data(channels, SAVE_FILE)
-        logger.info(f"Waiting for {UPDATE_DELAY} seconds before the next check...")
-        await asyncio.sleep(UPDATE_DELAY)
+        # Between cycles, so no channel is removed while it is being checked
+        if channel_list_watcher and channel_list_watcher.changed():
+            reload_channel_list()
+        summary = await run_poll_cycle(
+            http_client,
+            channels,
+            scheduler,
+            state_store,
+            router,
+            headers=token_manager.headers,
+            id_cache=id_cache,
+            limiter=rate_limiter,
+            enricher=enricher if RICH_ALERTS else None,
+            on_anomaly=dump_sink.record,
+            on_change=publish_status,
+            client_id=CLIENT_ID,
+            auth_key=AUTH_KEY,
+            concurrency=POLL_CONCURRENCY,
+            deadline=CYCLE_DEADLINE,
+        )
+        if summary:
+            event_broker.publish("cycle", summary.data(time=int(time.time()), circuit=HELIX_BREAKER.state))
+        next_due = scheduler.seconds_until_next()
+        delay = max(MIN_TICK, min(POLL_DELAY, next_due if next_due is not None else POLL_DELAY))
+        if channel_list_watcher:
+            delay = min(delay, max(MIN_TICK, UPDATE_DELAY))  # Don't leave list edits waiting for a long reconcile interval
+        logger.debug(f"Waiting for {delay:.1f} seconds before the next check...")
+        await asyncio.sleep(delay)
 
 def prompt_save_data():
-    save = input("Do you want to save the current states of each channel to save_data.json? [Y/n]: ").strip().lower()
+    save = input(f"Do you want to save the current states of each channel to {state_store.path}? [Y/n]: ").strip().lower()
     if save in ['y', 'yes', '']:
-        save_data(channels, SAVE_FILE)
+        save_data(channels, state_store)
         logger.info("Data saved successfully on shutdown.")
     else:
         logger.info("Data not saved on shutdown.")
 
 app = FastAPI()
 
+# Pooled HTTP client shared by polling and Discord notifications, owned by the app lifecycle
+http_client: httpx.AsyncClient = None
+channels = ChannelRegistry()
+# EventSub may deliver the same message more than once
+eventsub_deduper = eventsub.MessageDeduper()
+
 @app.on_event("startup")
 async def startup_event():
+    global http_client
+    http_client = create_http_client()
+    # One outbound queue per webhook, drained by background workers so alerts never block the loop
+    router.start(http_client, maxsize=WEBHOOK_QUEUE_SIZE, max_attempts=WEBHOOK_MAX_ATTEMPTS, log_level=DISCORD_LOG_LEVEL)
+    dump_sink.start()
+    metrics.HELIX_BUDGET_REMAINING.set_function(lambda: rate_limiter.budget()["remaining"])
+    metrics.POLL_OVERDUE.set_function(scheduler.overdue)
+    metrics.WEBHOOK_QUEUE_DEPTH.set_function(router.queue_depth)
+    metrics.EVENT_SUBSCRIBERS.set_function(lambda: len(event_broker.subscribers))
+    await token_manager.start(http_client)
     asyncio.create_task(monitor_channels())
 
 @app.on_event("shutdown")
@@ -237,20 +256,130 @@ async def shutdown_event():
     thread = threading.Thread(target=prompt_save_data)
     thread.start()
     thread.join()
+    event_broker.close()
+    await token_manager.stop()
+    await router.stop()
+    dump_sink.close()
+    await http_client.aclose()
 
 @app.get("/")
 async def read_root():
     return {"message": "Twitch Bot is running"}
 
+@app.get("/ratelimit")
+async def get_rate_limit_budget():
+    return rate_limiter.budget()
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/channels")
-async def get_channels_status():
-    channels = load_save_data(SAVE_FILE)
-    return {"channels": [channel.data() for channel in channels]}
+async def get_channels_status(
+    request: Request,
+    live: Optional[bool] = None,
+    prefix: str = "",
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    # The ETag covers the whole registry, so it is valid for every filter and page
+    etag = channels.etag
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    page, next_cursor = channels.page(prefix=prefix, live=live, after=cursor, limit=limit)
+    return JSONResponse(
+        {"channels": [channel.data() for channel in page], "next_cursor": next_cursor},
+        headers={"ETag": etag},
+    )
+
+@app.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[str] = None):
+    # EventSource sends Last-Event-ID itself when it reconnects; the query parameter is for resuming a new connection
+    subscriber = event_broker.subscribe(request.headers.get("Last-Event-ID") or last_event_id)
+    return StreamingResponse(
+        event_broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/events/stats")
+async def get_event_stats():
+    return event_broker.stats()
+
+@app.post("/eventsub")
+async def eventsub_callback(request: Request):
+    if not EVENTSUB_ENABLED:
+        return Response(status_code=404)
+
+    body = await request.body()
+    message_id = request.headers.get(eventsub.MESSAGE_ID_HEADER, "")
+    timestamp = request.headers.get(eventsub.MESSAGE_TIMESTAMP_HEADER, "")
+    signature = request.headers.get(eventsub.MESSAGE_SIGNATURE_HEADER, "")
+    if not eventsub.verify_signature(EVENTSUB_SECRET, message_id, timestamp, body, signature):
+        logger.warning(f"Rejected EventSub message {message_id}: invalid signature.")
+        return Response(status_code=403)
+    if not eventsub.is_fresh(timestamp):
+        logger.warning(f"Rejected EventSub message {message_id}: stale timestamp {timestamp}.")
+        return Response(status_code=403)
+    # Only remembered once handled below, so Twitch's retry of a message that failed here is handled again
+    if eventsub_deduper.seen(message_id):
+        return Response(status_code=204)
+
+    payload = codec.loads(body)
+    message_type = request.headers.get(eventsub.MESSAGE_TYPE_HEADER)
+    subscription = payload.get("subscription", {})
+
+    if message_type == eventsub.MESSAGE_TYPE_VERIFICATION:
+        logger.info(f"EventSub subscription {subscription.get('type')} {subscription.get('id')} verified.")
+        eventsub_deduper.handled(message_id)
+        return PlainTextResponse(payload["challenge"])
+
+    if message_type == eventsub.MESSAGE_TYPE_REVOCATION:
+        logger.warning(f"EventSub subscription {subscription.get('type')} {subscription.get('id')} revoked: {subscription.get('status')}")
+        eventsub_deduper.handled(message_id)
+        return Response(status_code=204)
+
+    if message_type == eventsub.MESSAGE_TYPE_NOTIFICATION:
+        event = payload.get("event", {})
+        login = event.get("broadcaster_user_login", "").lower()
+        channel = channels.find(login)
+        if channel is None:
+            logger.warning(f"EventSub notification for untracked channel '{login}'.")
+        else:
+            # Answered right away, so the embed only has what the event and the caches hold; no lookups here
+            stream = {
+                "user_id": event.get("broadcaster_user_id"),
+                "user_name": event.get("broadcaster_user_name"),
+                "started_at": event.get("started_at"),
+            }
+            started_at = event.get("started_at")
+            changed = core.update_channel_status(
+                channels,
+                channel,
+                subscription.get("type") == "stream.online",
+                router,
+                details=enricher.details(stream) if RICH_ALERTS else None,
+                started_at=started_at,
+                log_level=logging.INFO,
+            )
+            if changed is not None:
+                publish_status(channel, changed, started_at)
+            save_data([channel], state_store)
+    eventsub_deduper.handled(message_id)
+    return Response(status_code=204)
 
 @app.post("/webhook")
 async def trigger_webhook(channel_name: str, status: str):
-    send_webhook(channel_name, status)
-    return {"message": f"Webhook sent for {channel_name} with status {status}"}
+    queued, dropped = router.notify(channel_name, status)
+    if dropped:
+        return {"message": f"Webhook queue is full for {dropped} of {queued + dropped} routes, dropped {channel_name} with status {status} there"}
+    if not queued:
+        return {"message": f"No route is subscribed to {channel_name}"}
+    return {"message": f"Webhook queued for {channel_name} with status {status}" + (f" on {queued} routes" if queued > 1 else "")}
+
+@app.get("/routes")
+async def get_routes():
+    return router.stats()
 
 if __name__ == "__main__":
     import uvicorn
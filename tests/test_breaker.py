@@ -0,0 +1,68 @@
+from twitch.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def expire(breaker):
+    """Move the opening of `breaker` far enough back that its timeout is over."""
+    breaker.opened_at -= breaker.open_timeout
+
+
+def test_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert 0 < breaker.retry_in() <= 30
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, probes=1)
+    breaker.record_failure()
+    expire(breaker)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probes_double_the_timeout_up_to_max():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, max_timeout=25)
+    breaker.record_failure()
+    timeouts = []
+    for _ in range(3):
+        expire(breaker)
+        assert breaker.allow()
+        breaker.record_failure()
+        timeouts.append(breaker.open_timeout)
+    assert timeouts == [20, 25, 25]
+    assert breaker.state == OPEN
+
+    expire(breaker)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.open_timeout == 10
+
+
+def test_released_probe_lets_another_through():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_threshold_zero_disables_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
@@ -0,0 +1,76 @@
+from twitch.channel import Channel
+from twitch.core import keep_start_history, load_channels, reload_channel_list
+from twitch.scheduler import DAY_SECONDS, PollScheduler
+from twitch.store import StateStore
+
+
+def write_list(path, names):
+    path.write_text("".join(f"{name}\n" for name in names))
+
+
+def test_reload_keeps_channels_added_with_add_channel(tmp_path):
+    channel_list = tmp_path / "channels.txt"
+    write_list(channel_list, ["alpha", "beta"])
+    store = StateStore(str(tmp_path / "state.db"))
+    store.save([Channel("alpha"), Channel("beta", True)])
+    store.save([Channel("added", True)])  # What add-channel.py does: the store, not CHANNEL_LIST
+    channels = load_channels(store, str(channel_list))
+    scheduler = PollScheduler(base_interval=60)
+    for channel in channels:
+        scheduler.add(channel.name, live=channel.live)
+
+    write_list(channel_list, ["alpha", "gamma"])
+    added, removed = reload_channel_list(channels, str(channel_list), scheduler, store)
+
+    assert [channel.name for channel in added] == ["gamma"]
+    assert [channel.name for channel in removed] == ["beta"]
+    assert channels.names() == ["alpha", "added", "gamma"]
+    assert channels.get("added").live
+    assert "added" in scheduler and "beta" not in scheduler
+    assert {row["name"] for row in store.rows()} == {"alpha", "added"}
+
+
+def test_reload_on_a_fresh_start_removes_deleted_names(tmp_path):
+    channel_list = tmp_path / "channels.txt"
+    write_list(channel_list, ["alpha", "beta"])
+    store = StateStore(str(tmp_path / "state.db"))
+    channels = load_channels(store, str(channel_list))
+    scheduler = PollScheduler(base_interval=60)
+
+    write_list(channel_list, ["beta"])
+    added, removed = reload_channel_list(channels, str(channel_list), scheduler, store)
+
+    assert added == []
+    assert [channel.name for channel in removed] == ["alpha"]
+    assert channels.names() == ["beta"]
+
+
+def test_reload_ignores_a_missing_list(tmp_path):
+    channel_list = tmp_path / "channels.txt"
+    write_list(channel_list, ["alpha"])
+    store = StateStore(str(tmp_path / "state.db"))
+    channels = load_channels(store, str(channel_list))
+    channel_list.unlink()
+
+    assert reload_channel_list(channels, str(channel_list), PollScheduler(base_interval=60), store) == ([], [])
+    assert channels.names() == ["alpha"]
+
+
+def test_start_history_survives_a_restart(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    scheduler = PollScheduler(base_interval=600, fast_interval=60, history=2)
+    scheduler.add("alpha")
+    keep_start_history(scheduler, store)
+    for day in range(3):
+        scheduler.record("alpha", True, now=day * DAY_SECONDS + 3600, started_at=day * DAY_SECONDS + 3000)
+        scheduler.record("alpha", False, now=day * DAY_SECONDS + 7200)
+
+    assert store.load_starts() == {"alpha": [DAY_SECONDS + 3000, 2 * DAY_SECONDS + 3000]}
+
+    restarted = PollScheduler(base_interval=600, fast_interval=60, start_window=600)
+    restarted.add("alpha")
+    restarted.add("beta")
+    keep_start_history(restarted, StateStore(str(tmp_path / "state.db")))
+    # Inside the usual 00:50 window of alpha, so it's checked fast; beta has no history
+    assert restarted.record("alpha", False, now=5 * DAY_SECONDS + 2800) == 5 * DAY_SECONDS + 2800 + 60
+    assert restarted.record("beta", False, now=5 * DAY_SECONDS + 2800) == 5 * DAY_SECONDS + 2800 + 600
@@ -0,0 +1,72 @@
+import asyncio
+
+from twitch.events import EventBroker
+
+
+def messages(subscriber):
+    found = []
+    while not subscriber.queue.empty():
+        found.append(subscriber.queue.get_nowait())
+    return found
+
+
+def event_type(message):
+    return message.split(b"\n")[1 if message.startswith(b"id:") else 0]
+
+
+def test_subscribers_get_every_published_event():
+    broker = EventBroker(history=10, client_buffer=10)
+    subscriber = broker.subscribe()
+    event_id = broker.publish("status", {"channel": "alpha", "live": True})
+
+    [message] = messages(subscriber)
+    assert message == f'id: {event_id}\nevent: status\ndata: {{"channel":"alpha","live":true}}\n\n'.encode()
+
+
+def test_resume_replays_the_missed_events():
+    broker = EventBroker(history=10, client_buffer=10)
+    first = broker.publish("status", {"n": 1})
+    broker.publish("status", {"n": 2})
+    broker.publish("cycle", {"n": 3})
+
+    replayed = messages(broker.subscribe(first))
+    assert [event_type(message) for message in replayed] == [b"event: status", b"event: cycle"]
+    assert b'"n":2' in replayed[0]
+    assert messages(broker.subscribe(broker.stats()["last_event_id"])) == []
+
+
+def test_resume_from_too_far_back_or_another_run_resets():
+    broker = EventBroker(history=2, client_buffer=10)
+    first = broker.publish("status", {"n": 1})
+    for n in range(2, 5):
+        broker.publish("status", {"n": n})
+
+    for last_event_id in (first, "123-1", f"{broker.epoch}-99", "garbage"):
+        [message] = messages(broker.subscribe(last_event_id))
+        assert event_type(message) == b"event: reset"
+
+
+def test_slow_subscriber_is_dropped():
+    broker = EventBroker(history=10, client_buffer=2)
+    slow = broker.subscribe()
+    for n in range(3):
+        broker.publish("status", {"n": n})
+
+    assert slow.dropped and slow not in broker.subscribers
+    assert messages(slow) == [None]  # Ends its stream
+    assert broker.stats()["dropped"] == 1
+
+
+def test_stream_ends_when_the_broker_closes():
+    broker = EventBroker(history=10, client_buffer=10)
+
+    async def run():
+        subscriber = broker.subscribe()
+        broker.publish("status", {"n": 1})
+        broker.close()
+        return [chunk async for chunk in broker.stream(subscriber, keepalive=1)]
+
+    # Undelivered events are discarded, the client gets them when it resumes
+    chunks = asyncio.run(run())
+    assert len(chunks) == 1 and chunks[0].startswith(b"retry:")
+    assert broker.stats()["subscribers"] == 0
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+import pytest
+
+from twitch import codec
+from twitch.eventsub import MessageDeduper, list_subscriptions
+
+PAGES = {
+    None: {"data": [{"id": "1", "type": "stream.online", "condition": {"broadcaster_user_id": "10"}}], "pagination": {"cursor": "c1"}},
+    "c1": {"data": [{"id": "2", "type": "stream.offline", "condition": {"broadcaster_user_id": "10"}}], "pagination": {}},
+}
+
+
+@pytest.mark.parametrize("backend", codec.available_backends())
+def test_list_subscriptions_follows_pagination(monkeypatch, backend):
+    monkeypatch.setattr(codec, "BACKEND", backend)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=codec.dumps(PAGES[request.url.params.get("after")], backend="json"))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await list_subscriptions(client, {})
+
+    subscriptions = asyncio.run(run())
+    assert [subscription["id"] for subscription in subscriptions] == ["1", "2"]
+    assert subscriptions[0]["condition"] == {"broadcaster_user_id": "10"}
+
+
+def test_deduper_remembers_only_handled_messages():
+    deduper = MessageDeduper(maxlen=2)
+    assert not deduper.seen("a")
+    assert not deduper.seen("a")  # Not handled yet, so a retry is handled again
+    deduper.handled("a")
+    assert deduper.seen("a")
+    deduper.handled("b")
+    deduper.handled("c")
+    assert not deduper.seen("a")
+    assert deduper.seen("b") and deduper.seen("c")
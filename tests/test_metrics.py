@@ -0,0 +1,42 @@
+import pytest
+
+from twitch.metrics import Counter, Gauge, Histogram, Metric, Registry
+
+
+def test_metric_needs_samples():
+    with pytest.raises(TypeError):
+        Metric("plain", "No samples.", registry=Registry())
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = Registry()
+    counter = Counter("requests_total", "Requests.", ["path"], registry=registry)
+    gauge = Gauge("depth", "Queue depth.", registry=registry)
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    counter.inc(path="/streams")
+    counter.inc(2, path="/streams")
+    gauge.set_function(lambda: 7)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{path="/streams"} 3.0',
+        "# HELP depth Queue depth.",
+        "# TYPE depth gauge",
+        "depth 7.0",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 0.55",
+        "latency_seconds_count 2",
+    ]
+
+
+def test_labels_must_match():
+    counter = Counter("errors_total", "Errors.", ["type"], registry=Registry())
+    with pytest.raises(ValueError):
+        counter.inc(kind="timeout")
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from twitch.ratelimit import RateLimiter
+
+
+def test_headers_only_lower_the_local_estimate():
+    limiter = RateLimiter(limit=800)
+    limiter.update({"Ratelimit-Limit": "800", "Ratelimit-Remaining": "500", "Ratelimit-Reset": "1700000000"})
+    assert limiter.budget()["remaining"] == 500
+    assert limiter.reset_at == 1700000000
+
+    # A response sent before others were counted reports more than is left locally
+    limiter.update({"Ratelimit-Remaining": "700"})
+    assert limiter.budget()["remaining"] == 500
+
+
+def test_headers_update_the_limit_and_ignore_malformed_values():
+    limiter = RateLimiter(limit=800)
+    limiter.update({"Ratelimit-Limit": "1200", "Ratelimit-Remaining": "soon"})
+    assert limiter.limit == 1200
+    assert limiter.budget()["remaining"] == 800
+    limiter.update({})
+    assert limiter.limit == 1200
+
+
+def test_rate_limited_response_empties_the_bucket_until_reset():
+    limiter = RateLimiter(limit=800)
+    limiter.on_rate_limited({"Ratelimit-Remaining": "0", "Ratelimit-Reset": str(time.time() + 5)})
+    assert limiter.budget()["remaining"] == 0
+    assert limiter.throttled == 1
+    assert 4 < limiter.blocked_until - time.monotonic() <= 5
+
+
+def test_acquire_waits_for_tokens():
+    limiter = RateLimiter(limit=2, window=0.2)  # A token every 0.1 seconds
+
+    async def acquire(count):
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(count)))
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire(4)) >= 0.15
+    assert limiter.queued == 0
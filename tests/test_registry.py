@@ -0,0 +1,69 @@
+import pytest
+
+from twitch.channel import Channel
+from twitch.registry import ChannelRegistry, etag_matches
+
+ETAG = '"abc-3"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    ['"abc-3"', 'W/"abc-3"', '"abc-2", "abc-3"', '"old",W/"abc-3"', "*", " * "],
+)
+def test_etag_matches(if_none_match):
+    assert etag_matches(if_none_match, ETAG)
+
+
+@pytest.mark.parametrize("if_none_match", [None, "", '"abc-2"', 'W/"abc-2", "abc-4"', "abc-3", '"abc-3-1"'])
+def test_etag_does_not_match(if_none_match):
+    assert not etag_matches(if_none_match, ETAG)
+
+
+def test_etag_changes_with_the_registry():
+    channels = ChannelRegistry()
+    etag = channels.etag
+    channels.add_name("alpha")
+    assert not etag_matches(etag, channels.etag)
+    assert etag_matches(f"W/{channels.etag}", channels.etag)
+
+
+def make_registry(names, live=()):
+    return ChannelRegistry(Channel(name, name in live) for name in names)
+
+
+def test_page_cursors_walk_every_channel_in_login_order():
+    channels = make_registry(["delta", "Alpha", "charlie", "bravo", "echo"])
+    names, cursor = [], None
+    while True:
+        page, cursor = channels.page(after=cursor, limit=2)
+        names.extend(channel.name for channel in page)
+        if cursor is None:
+            break
+    assert names == ["Alpha", "bravo", "charlie", "delta", "echo"]
+
+
+def test_page_filters_by_prefix_and_live_state():
+    channels = make_registry(["alpha", "Alpine", "alto", "beta"], live={"Alpine", "beta"})
+    page, cursor = channels.page(prefix="AL")
+    assert [channel.name for channel in page] == ["alpha", "Alpine", "alto"]
+    assert cursor is None
+    assert [channel.name for channel in channels.page(live=True)[0]] == ["Alpine", "beta"]
+    assert [channel.name for channel in channels.page(prefix="al", live=False, limit=1)[0]] == ["alpha"]
+
+
+def test_page_cursor_survives_changes_between_pages():
+    channels = make_registry(["alpha", "bravo", "charlie", "delta"])
+    page, cursor = channels.page(limit=2)
+    assert cursor == "bravo"
+    channels.remove("bravo")
+    channels.add_name("aardvark")  # Sorts before the cursor, so it isn't on a later page
+    page, cursor = channels.page(after=cursor, limit=2)
+    assert [channel.name for channel in page] == ["charlie", "delta"]
+    assert cursor is None
+
+
+def test_find_ignores_case():
+    channels = make_registry(["MixedCase"])
+    assert channels.find("mixedcase").name == "MixedCase"
+    channels.remove("MixedCase")
+    assert channels.find("mixedcase") is None
@@ -0,0 +1,72 @@
+from twitch.scheduler import DAY_SECONDS, PollScheduler
+
+MIDNIGHT = 20 * DAY_SECONDS  # Some UTC midnight, so times of day are easy to read
+
+
+def test_start_window_uses_the_streams_started_at():
+    scheduler = PollScheduler(base_interval=600, fast_interval=60, max_interval=3600, start_window=1800)
+    scheduler.add("alpha")
+    started_at = MIDNIGHT + 18 * 3600  # Went live at 18:00, but the check only ran at 18:25
+    scheduler.record("alpha", True, now=started_at + 25 * 60, started_at=started_at)
+    scheduler.record("alpha", False, now=started_at + 3 * 3600)
+
+    # The next day 17:35 is inside the 18:00 window, it wouldn't be around 18:25
+    assert scheduler.record("alpha", False, now=started_at + DAY_SECONDS - 25 * 60) == started_at + DAY_SECONDS - 25 * 60 + 60
+
+
+def test_start_without_started_at_is_the_check_time():
+    starts = []
+    scheduler = PollScheduler(base_interval=600, on_start=lambda name, started_at: starts.append((name, started_at)))
+    scheduler.add("alpha")
+    scheduler.record("alpha", True, now=MIDNIGHT + 100)
+    scheduler.record("alpha", True, now=MIDNIGHT + 700)  # Still live, not a new start
+
+    assert starts == [("alpha", MIDNIGHT + 100)]
+
+
+def test_offline_channels_back_off_up_to_max_interval():
+    # No start window, so going live doesn't speed up the checks right after
+    scheduler = PollScheduler(base_interval=60, fast_interval=30, max_interval=200, backoff=2, start_window=0)
+    scheduler.add("alpha", due=0)
+    intervals = []
+    now = 0.0
+    for _ in range(4):
+        due = scheduler.record("alpha", False, now=now)
+        intervals.append(due - now)
+        now = due
+    assert intervals == [60, 120, 200, 200]
+
+    assert scheduler.record("alpha", True, now=now) == now + 30
+    # Back offline, the backoff starts over from base_interval
+    assert scheduler.record("alpha", False, now=now + 30) == now + 30 + 60
+
+
+def test_unknown_status_keeps_the_base_interval():
+    scheduler = PollScheduler(base_interval=60, max_interval=600, backoff=2)
+    scheduler.add("alpha", due=0)
+    scheduler.record("alpha", False, now=0)
+    assert scheduler.record("alpha", None, now=100) == 160
+
+
+def test_pop_due_stays_within_the_request_budget():
+    scheduler = PollScheduler(base_interval=60, requests_per_minute=2, batch_size=10)
+    for index in range(50):
+        scheduler.add(f"channel{index:02}", due=index)
+
+    first = scheduler.pop_due(now=100)
+    assert first == [f"channel{index:02}" for index in range(20)]  # Two requests of 10, in due order
+    assert scheduler.pop_due(now=100) == []
+    assert scheduler.pop_due(now=130) == [f"channel{index:02}" for index in range(20, 30)]  # Half a minute refills one
+    assert scheduler.overdue(now=130) == 130 - 30
+
+
+def test_removed_channels_are_not_popped():
+    scheduler = PollScheduler(base_interval=60)
+    scheduler.add("alpha", due=0)
+    scheduler.add("beta", due=1)
+    scheduler.remove("alpha")
+
+    assert scheduler.seconds_until_next(now=0) == 1
+    assert scheduler.pop_due(now=10) == ["beta"]
+    assert scheduler.record("alpha", True, now=10) == float("inf")
+    assert "alpha" not in scheduler and len(scheduler) == 1
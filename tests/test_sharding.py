@@ -0,0 +1,37 @@
+import pytest
+
+from twitch.sharding import HashRing, parse_workers, shard_save_file
+
+CHANNELS = [f"channel{index}" for index in range(2000)]
+
+
+def test_every_channel_has_exactly_one_owner():
+    ring = HashRing(["worker-1", "worker-2", "worker-3"])
+    owned = [ring.owned_by(worker, CHANNELS) for worker in ring.workers]
+    assert sorted(name for names in owned for name in names) == sorted(CHANNELS)
+    assert all(len(names) > len(CHANNELS) / 3 * 0.7 for names in owned)
+
+
+def test_adding_a_worker_only_moves_channels_to_it():
+    before = HashRing(["worker-1", "worker-2", "worker-3"])
+    after = HashRing(["worker-1", "worker-2", "worker-3", "worker-4"])
+    moved = [name for name in CHANNELS if before.worker_for(name) != after.worker_for(name)]
+
+    assert all(after.worker_for(name) == "worker-4" for name in moved)
+    assert len(CHANNELS) / 4 * 0.7 < len(moved) < len(CHANNELS) / 4 * 1.3
+
+
+def test_owner_ignores_case_and_worker_order():
+    ring = HashRing(["b", "a"])
+    assert ring.worker_for("Channel") == ring.worker_for("channel") == HashRing(["a", "b"]).worker_for("CHANNEL")
+
+
+def test_a_ring_needs_workers():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_parse_workers_and_save_files():
+    assert parse_workers(" worker-1, ,worker-2 ") == ["worker-1", "worker-2"]
+    assert parse_workers(None) == []
+    assert shard_save_file("data/save_data.json", "worker-1") == "data/save_data.worker-1.json"
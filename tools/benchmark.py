@@ -0,0 +1,199 @@
+"""
+Benchmark the real polling loop of bot.py (or server.py) against the local mock
+Helix API and Discord sink, at several channel counts.
+
+For every size a fresh worker is started with its own state, left running for
+`--duration` seconds while the live channels go live spread over the first half
+of the run, and then stopped. The results are printed as a table and written as
+JSON so runs can be compared to catch regressions.
+
+Usage:
+    python tools/benchmark.py --sizes 100,1000,10000,100000 --duration 60 --output benchmark.json
+    python tools/benchmark.py --target server --latency-ms 80 --error-rate 0.02
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout} seconds")
+
+
+def percentile(values: List[float], share: float) -> Optional[float]:
+    """Nearest-rank percentile, None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(share * len(ordered))) - 1))]
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled samples of a Prometheus text exposition, by metric name."""
+    samples: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, _, value = line.partition(" ")
+            try:
+                samples[name] = float(value)
+            except ValueError:
+                pass
+    return samples
+
+
+def worker_command(target: str, metrics_port: int) -> List[str]:
+    if target == "server":
+        return [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", ROOT, "--port", str(metrics_port), "--log-level", "warning"]
+    return [sys.executable, os.path.join(ROOT, "bot.py")]
+
+
+def run_size(args: argparse.Namespace, size: int, base_url: str) -> dict:
+    """Run one worker over `size` channels and collect its numbers."""
+    with tempfile.TemporaryDirectory() as workdir:
+        channel_list = os.path.join(workdir, "channels.txt")
+        with open(channel_list, "w") as f:
+            f.write("\n".join(f"channel{index}" for index in range(size)) + "\n")
+
+        httpx.post(f"{base_url}/reset", params={"go_live_window": args.duration / 2}).raise_for_status()
+        env = dict(
+            os.environ,
+            DISCORD_WEBHOOK_URL=f"{base_url}/discord",
+            TWITCH_ROLE_ID="1",
+            CHANNEL_LIST=channel_list,
+            UPDATE_DELAY_MIN=str(args.update_delay / 60),
+            SAVE_FILE=os.path.join(workdir, "save_data.json"),
+            CLIENT_ID="benchmark",
+            AUTH_KEY="mock",
+            HELIX_URL=f"{base_url}/helix",
+            HTTP2="false",
+            METRICS_PORT=str(args.metrics_port),
+            HELIX_REQUESTS_PER_MINUTE=str(args.requests_per_minute),
+        )
+        log = open(os.path.join(workdir, "worker.out"), "w")
+        started = time.monotonic()
+        process = subprocess.Popen(
+            worker_command(args.target, args.metrics_port), env=env, cwd=workdir, stdin=subprocess.DEVNULL, stdout=log, stderr=log
+        )
+        try:
+            wait_for_port(args.metrics_port)
+            time.sleep(max(0.0, args.duration - (time.monotonic() - started)))
+            worker_metrics = parse_metrics(httpx.get(f"http://127.0.0.1:{args.metrics_port}/metrics").text)
+            stats = httpx.get(f"{base_url}/stats").json()
+        finally:
+            process.terminate()
+            try:
+                _, _, usage = os.wait4(process.pid, 0)  # Resource usage of this worker alone
+            except ChildProcessError:
+                usage = None
+            log.close()
+
+    cycles = int(worker_metrics.get("twitch_poll_cycle_duration_seconds_count", 0))
+    helix_requests = sum(count for path, count in stats["requests_by_path"].items() if path.startswith("/helix"))
+    latencies = stats["detection_latencies"]
+    expected_live = sum(1 for index in range(size) if is_live_in_mock(f"channel{index}", args.live_percent))
+    return {
+        "channels": size,
+        "cycles": cycles,
+        "cycle_seconds_mean": worker_metrics.get("twitch_poll_cycle_duration_seconds_sum", 0.0) / cycles if cycles else None,
+        "helix_requests": helix_requests,
+        "requests_per_cycle": helix_requests / cycles if cycles else None,
+        "responses_by_status": stats["responses_by_status"],
+        "webhooks": stats["webhooks"],
+        "live_detected": len(latencies),
+        "live_expected": expected_live,
+        "detection_p50_seconds": percentile(latencies, 0.50),
+        "detection_p99_seconds": percentile(latencies, 0.99),
+        "max_rss_mb": usage.ru_maxrss / 1024 if usage else None,  # ru_maxrss is in KiB on Linux
+        "cpu_seconds": usage.ru_utime + usage.ru_stime if usage else None,
+    }
+
+
+def is_live_in_mock(login: str, live_percent: float) -> bool:
+    """Same selection as tools/mock_helix.py, to know how many alerts to expect."""
+    return zlib.crc32(login.lower().encode()) % 10000 < live_percent * 100
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the polling loop against a mock Helix API")
+    parser.add_argument("--target", choices=["bot", "server"], default="bot")
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="Comma separated channel counts")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run each size")
+    parser.add_argument("--update-delay", type=float, default=10.0, help="UPDATE_DELAY of the worker, in seconds")
+    parser.add_argument("--requests-per-minute", type=float, default=600, help="HELIX_REQUESTS_PER_MINUTE of the worker")
+    parser.add_argument("--live-percent", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=800, help="Mock Helix requests per minute")
+    parser.add_argument("--port", type=int, default=8082, help="Port of the mock Helix server")
+    parser.add_argument("--metrics-port", type=int, default=9464, help="Port the worker serves /metrics on")
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "tools", "mock_helix.py"),
+        "--port", str(args.port),
+        "--live-percent", str(args.live_percent),
+        "--latency-ms", str(args.latency_ms),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit", str(args.rate_limit),
+    ])
+    results = []
+    try:
+        wait_for_port(args.port)
+        for size in sizes:
+            print(f"Running {args.target} with {size} channels for {args.duration:.0f} seconds...", flush=True)
+            results.append(run_size(args, size, f"http://127.0.0.1:{args.port}"))
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+
+    columns = [
+        "channels", "cycles", "cycle_seconds_mean", "requests_per_cycle", "live_detected", "live_expected",
+        "detection_p50_seconds", "detection_p99_seconds", "max_rss_mb", "cpu_seconds",
+    ]
+    print(" ".join(f"{column:>22}" for column in columns))
+    for result in results:
+        print(" ".join(f"{format_value(result[column]):>22}" for column in columns))
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "target": args.target,
+                "python": platform.python_version(),
+                "settings": {key: value for key, value in vars(args).items() if key != "output"},
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
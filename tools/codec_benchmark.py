@@ -0,0 +1,157 @@
+"""
+Benchmark the JSON codecs of twitch/codec.py on realistic Helix payloads.
+
+Full pages of /streams, /users and /games responses (100 objects
+each, with every field Twitch sends) are decoded, and a batch of troubleshooting
+dump records is encoded, with every installed backend. The time per page is then
+scaled to the pages a poll cycle decodes at several channel counts, to show the
+CPU time saved per cycle compared to the stdlib `json`.
+
+Usage:
+    python tools/codec_benchmark.py --sizes 1000,10000,100000 --output codec_benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitch import codec  # noqa: E402
+
+PAGE_SIZE = 100
+
+
+def stream(index: int) -> dict:
+    login = f"channel{index}"
+    return {
+        "id": str(40000000000 + index),
+        "user_id": str(100000 + index),
+        "user_login": login,
+        "user_name": login.capitalize(),
+        "game_id": str(random.randint(1, 600000)),
+        "game_name": random.choice(["Just Chatting", "Fortnite", "League of Legends", "Minecraft"]),
+        "type": "live",
+        "title": f"Stream number {index} " + "with a fairly long title " * 3,
+        "viewer_count": random.randint(0, 50000),
+        "started_at": "2024-05-01T18:00:00Z",
+        "language": "en",
+        "thumbnail_url": f"https://static-cdn.jtvnw.net/previews-ttv/live_user_{login}-{{width}}x{{height}}.jpg",
+        "tag_ids": [],
+        "tags": ["English", "Competitive", "NoBackseating", "Chill"],
+        "is_mature": False,
+    }
+
+
+def user(index: int) -> dict:
+    login = f"channel{index}"
+    return {
+        "id": str(100000 + index),
+        "login": login,
+        "display_name": login.capitalize(),
+        "type": "",
+        "broadcaster_type": random.choice(["", "affiliate", "partner"]),
+        "description": "Just a streamer streaming streams. " * 4,
+        "profile_image_url": f"https://static-cdn.jtvnw.net/jtv_user_pictures/{login}-profile_image-300x300.png",
+        "offline_image_url": f"https://static-cdn.jtvnw.net/jtv_user_pictures/{login}-channel_offline_image-1920x1080.png",
+        "view_count": 0,
+        "created_at": "2016-12-14T20:32:28Z",
+    }
+
+
+def game(index: int) -> dict:
+    return {
+        "id": str(500000 + index),
+        "name": f"Game number {index}",
+        "box_art_url": f"https://static-cdn.jtvnw.net/ttv-boxart/{500000 + index}-{{width}}x{{height}}.jpg",
+        "igdb_id": str(10000 + index),
+    }
+
+
+def page(factory: Callable[[int], dict]) -> bytes:
+    return json.dumps({"data": [factory(index) for index in range(PAGE_SIZE)], "pagination": {}}).encode()
+
+
+def best_of(function: Callable[[], object], rounds: int, repeat: int = 5) -> float:
+    """Seconds per call, the best of `repeat` runs of `rounds` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            function()
+        best = min(best, (time.perf_counter() - started) / rounds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON codecs on Helix payloads")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated channel counts")
+    parser.add_argument("--rounds", type=int, default=200, help="Calls per timing run")
+    parser.add_argument("--live-percent", type=float, default=5.0, help="Share of channels live, sizes the /streams pages")
+    parser.add_argument("--output", default="codec_benchmark.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    random.seed(0)
+    pages = {"streams": page(stream), "users": page(user), "games": page(game)}
+    records = [
+        {"time": "2024-05-01T18:00:00+00:00", "channel": f"channel{index}", "status": "unexpected", "content": stream(index)}
+        for index in range(PAGE_SIZE)
+    ]
+
+    backends = codec.available_backends()
+    timings: Dict[str, Dict[str, float]] = {}
+    for backend in backends:
+        timings[backend] = {
+            f"decode_{kind}_us": best_of(lambda: codec.decode_data(content, kind, backend), args.rounds) * 1e6
+            for kind, content in pages.items()
+        }
+        timings[backend]["encode_records_us"] = best_of(
+            lambda: [codec.dumps(record, backend=backend) for record in records], args.rounds
+        ) * 1e6
+
+    print(f"Microseconds per page of {PAGE_SIZE} (records for encode_records):")
+    columns = list(timings[backends[0]])
+    print(f"{'backend':>10} " + " ".join(f"{column:>24}" for column in columns))
+    for backend in backends:
+        print(f"{backend:>10} " + " ".join(f"{timings[backend][column]:>24.1f}" for column in columns))
+
+    # A cycle requests a /streams page per 100 channels, but the pages only hold the live ones
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    per_cycle: List[dict] = []
+    baseline = timings["json"]["decode_streams_us"]
+    for size in sizes:
+        pages_per_cycle = -(-size // PAGE_SIZE)
+        scale = args.live_percent / 100
+        row = {"channels": size}
+        for backend in backends:
+            cpu_ms = pages_per_cycle * timings[backend]["decode_streams_us"] * scale / 1000
+            row[f"{backend}_ms"] = cpu_ms
+            row[f"{backend}_saved_ms"] = pages_per_cycle * baseline * scale / 1000 - cpu_ms
+        per_cycle.append(row)
+
+    print(f"\nDecode CPU per poll cycle with {args.live_percent:g}% of channels live (milliseconds):")
+    print(" ".join(f"{column:>16}" for column in per_cycle[0]))
+    for row in per_cycle:
+        print(" ".join(f"{value:>16.2f}" if isinstance(value, float) else f"{value:>16}" for value in row.values()))
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "backends": backends,
+                "settings": {key: value for key, value in vars(args).items() if key != "output"},
+                "per_page": timings,
+                "per_cycle": per_cycle,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
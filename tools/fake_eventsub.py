@@ -0,0 +1,89 @@
+"""
+Send signed EventSub webhook messages to a local server, the way Twitch would.
+
+Usage:
+    python tools/fake_eventsub.py --secret <EVENTSUB_SECRET> verify
+    python tools/fake_eventsub.py --secret <EVENTSUB_SECRET> online --login <channel>
+    python tools/fake_eventsub.py --secret <EVENTSUB_SECRET> offline --login <channel> --repeat 2
+"""
+import os
+import sys
+import json
+import uuid
+import argparse
+from datetime import datetime, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitch import eventsub
+
+
+def build_message(kind: str, login: str, broadcaster_id: str) -> tuple:
+    """Build the (message type, payload) pair for the given kind of message."""
+    subscription_type = "stream.offline" if kind == "offline" else "stream.online"
+    subscription = {
+        "id": str(uuid.uuid4()),
+        "status": "enabled",
+        "type": subscription_type,
+        "version": "1",
+        "condition": {"broadcaster_user_id": broadcaster_id},
+        "transport": {"method": "webhook", "callback": "http://localhost/eventsub"},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if kind == "verify":
+        subscription["status"] = "webhook_callback_verification_pending"
+        return eventsub.MESSAGE_TYPE_VERIFICATION, {"challenge": uuid.uuid4().hex, "subscription": subscription}
+    if kind == "revoke":
+        subscription["status"] = "authorization_revoked"
+        return eventsub.MESSAGE_TYPE_REVOCATION, {"subscription": subscription}
+
+    event = {
+        "broadcaster_user_id": broadcaster_id,
+        "broadcaster_user_login": login,
+        "broadcaster_user_name": login,
+    }
+    if kind == "online":
+        event.update({"id": str(uuid.uuid4()), "type": "live", "started_at": datetime.now(timezone.utc).isoformat()})
+    return eventsub.MESSAGE_TYPE_NOTIFICATION, {"subscription": subscription, "event": event}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send fake, signed Twitch EventSub messages")
+    parser.add_argument("kind", choices=["verify", "online", "offline", "revoke"], help="Kind of message to send")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/eventsub", help="EventSub callback URL")
+    parser.add_argument("--secret", default=os.getenv("EVENTSUB_SECRET"), help="Shared EventSub secret")
+    parser.add_argument("--login", default="twitch", help="Broadcaster login for notifications")
+    parser.add_argument("--id", default="12826", help="Broadcaster ID for notifications")
+    parser.add_argument("--repeat", type=int, default=1, help="Send the same message this many times (dedupe check)")
+    parser.add_argument("--bad-signature", action="store_true", help="Corrupt the signature (rejection check)")
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("--secret or EVENTSUB_SECRET is required")
+
+    message_type, payload = build_message(args.kind, args.login, args.id)
+    body = json.dumps(payload).encode()
+    message_id = str(uuid.uuid4())
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    signature = eventsub.sign(args.secret, message_id, timestamp, body)
+    if args.bad_signature:
+        signature = signature[:-4] + "0000"
+
+    headers = {
+        "Content-Type": "application/json",
+        eventsub.MESSAGE_ID_HEADER: message_id,
+        eventsub.MESSAGE_TIMESTAMP_HEADER: timestamp,
+        eventsub.MESSAGE_SIGNATURE_HEADER: signature,
+        eventsub.MESSAGE_TYPE_HEADER: message_type,
+        "Twitch-Eventsub-Subscription-Type": payload["subscription"]["type"],
+        "Twitch-Eventsub-Subscription-Version": "1",
+    }
+    for _ in range(args.repeat):
+        response = httpx.post(args.url, content=body, headers=headers)
+        print(f"{message_type} -> {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
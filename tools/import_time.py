@@ -0,0 +1,124 @@
+"""
+Measure the startup cost of the entry points: bot.py, server.py and add-channel.py.
+
+Every entry point is started `--runs` times in a fresh interpreter, inside a
+scratch directory with placeholder settings, and only imported (add-channel.py
+runs with --help). The best wall time, the import time reported by
+`python -X importtime` and the peak memory are printed and written as JSON.
+
+Point `--root` at another checkout to measure it too, and pass its results to
+`--baseline` to print the difference:
+    python tools/import_time.py --root /tmp/old-checkout --output before.json
+    python tools/import_time.py --baseline before.json --output after.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    "bot.py": ["-c", "import bot"],
+    "server.py": ["-c", "import server"],
+    "add-channel.py --help": ["{root}/add-channel.py", "--help"],
+}
+
+
+def placeholder_env(workdir: str, root: str) -> Dict[str, str]:
+    with open(os.path.join(workdir, "channels.txt"), "w") as f:
+        f.write("channel0\n")
+    return dict(
+        os.environ,
+        PYTHONPATH=root,
+        DISCORD_WEBHOOK_URL="http://127.0.0.1:9/discord",
+        TWITCH_ROLE_ID="1",
+        CHANNEL_LIST=os.path.join(workdir, "channels.txt"),
+        UPDATE_DELAY_MIN="1",
+        SAVE_FILE=os.path.join(workdir, "save_data.json"),
+        CLIENT_ID="import-time",
+        AUTH_KEY="import-time",
+        LOG_FILE=os.path.join(workdir, "twitch_bot.log"),
+    )
+
+
+def import_microseconds(stderr: str) -> int:
+    """Total import time of a `-X importtime` report: the cumulative times of the top-level imports."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not name[1:].startswith(" "):  # Nested imports are indented
+            total += int(cumulative)
+    return total
+
+
+def measure(root: str, args: List[str], runs: int) -> dict:
+    wall: List[float] = []
+    imports: List[int] = []
+    rss: List[float] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        env = placeholder_env(workdir, root)
+        command = [sys.executable, "-X", "importtime"] + [arg.format(root=root) for arg in args]
+        for _ in range(runs):
+            started = time.perf_counter()
+            process = subprocess.Popen(command, env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            stderr = process.stderr.read()
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            wall.append(time.perf_counter() - started)
+            if process.returncode != 0:
+                raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}:\n{stderr[-2000:]}")
+            imports.append(import_microseconds(stderr))
+            rss.append(usage.ru_maxrss / 1024)  # ru_maxrss is in KiB on Linux
+    return {
+        "wall_seconds": min(wall),
+        "import_seconds": min(imports) / 1e6,
+        "max_rss_mb": min(rss),
+    }
+
+
+def delta(value: float, baseline: Optional[float]) -> str:
+    if not baseline:
+        return ""
+    return f" ({(value - baseline) / baseline:+.0%})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time and memory of the entry points")
+    parser.add_argument("--root", default=ROOT, help="Checkout to measure")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per entry point, the best one is reported")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--output", default="import_time.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'entry point':<24} {'wall':>18} {'imports':>18} {'max rss':>20}")
+    for name, entry_args in ENTRY_POINTS.items():
+        result = results[name] = measure(os.path.abspath(args.root), entry_args, args.runs)
+        before = baseline.get(name, {})
+        print(
+            f"{name:<24}"
+            f" {result['wall_seconds'] * 1000:>8.0f} ms{delta(result['wall_seconds'], before.get('wall_seconds')):>7}"
+            f" {result['import_seconds'] * 1000:>8.0f} ms{delta(result['import_seconds'], before.get('import_seconds')):>7}"
+            f" {result['max_rss_mb']:>8.1f} MB{delta(result['max_rss_mb'], before.get('max_rss_mb')):>7}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump({"root": os.path.abspath(args.root), "python": platform.python_version(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
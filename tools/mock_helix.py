@@ -0,0 +1,257 @@
+"""
+Local stand-in for the Twitch Helix API and a Discord webhook sink.
+
+Implements just enough of /helix/users, /helix/streams and /helix/games for the bot, enforces
+a per Client-ID Ratelimit-* bucket, and counts every request per Client-ID so
+runs with several workers can be compared. Latency and a share of 500 errors can
+be added to every Helix response.
+
+With a go-live window the live channels don't start live: each one goes live at
+a fixed, spread out point in the window after the last POST /reset, and the
+Discord sink records how long after that its live alert arrived.
+
+With a token TTL, POST /oauth2/token hands out client credentials tokens that
+expire after that many seconds, and Helix answers 401 to any other bearer token.
+POST /revoke-tokens invalidates all of them at once.
+
+Usage:
+    python tools/mock_helix.py --port 8081 --live-percent 5 --latency-ms 50 --error-rate 0.01
+    HELIX_URL=http://127.0.0.1:8081/helix DISCORD_WEBHOOK_URL=http://127.0.0.1:8081/discord python bot.py
+    python tools/mock_helix.py --token-ttl 300
+    OAUTH_TOKEN_URL=http://127.0.0.1:8081/oauth2/token SECRET=anything ... python bot.py
+"""
+import re
+import time
+import zlib
+import random
+import asyncio
+import secrets
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+LIVE_PERCENT: float = 5.0
+RATE_LIMIT: int = 800  # Requests per minute and Client-ID
+LATENCY: float = 0.0  # Seconds added to every Helix response
+ERROR_RATE: float = 0.0  # Share of Helix requests answered with a 500
+GO_LIVE_WINDOW: float = 0.0  # Seconds over which the live channels go live after a reset, 0 for live from the start
+TOKEN_TTL: float = 0.0  # Lifetime of issued tokens, 0 to accept any bearer token
+ALERT_PATTERN = re.compile(r"\[(\w+)\]\(\S+\) is live!")
+
+epoch: float = time.time()
+rng = random.Random(0)
+buckets: Dict[str, Tuple[float, float]] = {}  # Client-ID -> (tokens, last refill)
+requests_by_client: Counter = Counter()
+requests_by_path: Counter = Counter()
+responses_by_status: Counter = Counter()
+webhooks: List[dict] = []
+tokens: Dict[str, float] = {}  # Issued token -> expiry
+tokens_issued: int = 0
+detection_latencies: List[float] = []
+
+
+def user_id_for(login: str) -> str:
+    """Stable, reversible fake broadcaster ID."""
+    return login.lower().encode().hex()
+
+
+def login_for(user_id: str) -> str:
+    try:
+        return bytes.fromhex(user_id).decode()
+    except ValueError:
+        return ""
+
+
+def is_live(login: str) -> bool:
+    """Deterministically mark LIVE_PERCENT percent of the logins as live."""
+    return zlib.crc32(login.lower().encode()) % 10000 < LIVE_PERCENT * 100
+
+
+def went_live_at(login: str) -> Optional[float]:
+    """When a live login went live, or None if it hasn't (yet)."""
+    if not is_live(login):
+        return None
+    offset = zlib.crc32(f"{login.lower()}#start".encode()) % 10000 / 10000 * GO_LIVE_WINDOW
+    return epoch + offset if epoch + offset <= time.time() else None
+
+
+def take_token(client_id: str) -> Tuple[bool, int]:
+    """Spend one request of `client_id`'s bucket. Returns (allowed, remaining)."""
+    now = time.monotonic()
+    tokens, last = buckets.get(client_id, (float(RATE_LIMIT), now))
+    tokens = min(float(RATE_LIMIT), tokens + (now - last) * RATE_LIMIT / 60)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    buckets[client_id] = (tokens, now)
+    return allowed, int(tokens)
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    client_id = request.headers.get("Client-ID", "-")
+    requests_by_client[client_id] += 1
+    requests_by_path[request.url.path] += 1
+    if not request.url.path.startswith("/helix"):
+        return await call_next(request)
+
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    allowed, remaining = take_token(client_id)
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if TOKEN_TTL and tokens.get(bearer, 0) < time.time():
+        response = JSONResponse({"error": "Unauthorized", "status": 401, "message": "Invalid OAuth token"}, status_code=401)
+    elif not allowed:
+        response = JSONResponse({"error": "Too Many Requests", "status": 429}, status_code=429)
+    elif ERROR_RATE and rng.random() < ERROR_RATE:
+        response = JSONResponse({"error": "Internal Server Error", "status": 500}, status_code=500)
+    else:
+        response = await call_next(request)
+    response.headers.update({
+        "Ratelimit-Limit": str(RATE_LIMIT),
+        "Ratelimit-Remaining": str(remaining),
+        "Ratelimit-Reset": str(int(time.time()) + 60),
+    })
+    responses_by_status[response.status_code] += 1
+    return response
+
+
+@app.get("/helix/users")
+async def users(login: List[str] = Query(default=[]), id: List[str] = Query(default=[])):
+    logins = [name.lower() for name in login] + [login_for(user_id) for user_id in id]
+    return {"data": [
+        {
+            "id": user_id_for(name),
+            "login": name,
+            "display_name": name,
+            "profile_image_url": f"https://static-cdn.example/{name}-profile_image-300x300.png",
+        }
+        for name in logins if name
+    ]}
+
+
+def game_id_for(login: str) -> str:
+    """One of ten fake games per login."""
+    return str(zlib.crc32(f"{login.lower()}#game".encode()) % 10 + 1)
+
+
+@app.get("/helix/games")
+async def games(id: List[str] = Query(default=[])):
+    return {"data": [
+        {"id": game_id, "name": f"Game {game_id}", "box_art_url": f"https://static-cdn.example/game-{game_id}-{{width}}x{{height}}.jpg"}
+        for game_id in id if game_id.isdigit() and 1 <= int(game_id) <= 10
+    ]}
+
+
+@app.get("/helix/streams")
+async def streams(user_login: List[str] = Query(default=[]), user_id: List[str] = Query(default=[])):
+    logins = [name.lower() for name in user_login] + [login_for(value) for value in user_id]
+    data = []
+    for name in logins:
+        started = went_live_at(name) if name else None
+        if started is None:
+            continue
+        data.append({
+            "id": str(zlib.crc32(name.encode())),
+            "user_id": user_id_for(name),
+            "user_login": name,
+            "user_name": name,
+            "game_id": game_id_for(name),
+            "game_name": f"Game {game_id_for(name)}",
+            "type": "live",
+            "title": f"{name} is streaming",
+            "viewer_count": 42,
+            "started_at": datetime.fromtimestamp(int(started), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "thumbnail_url": f"https://static-cdn.example/previews-ttv/live_user_{name}-{{width}}x{{height}}.jpg",
+        })
+    return {"data": data, "pagination": {}}
+
+
+@app.post("/oauth2/token")
+async def oauth_token(request: Request):
+    global tokens_issued
+    form = parse_qs((await request.body()).decode())
+    if form.get("grant_type") != ["client_credentials"] or not form.get("client_id") or not form.get("client_secret"):
+        return JSONResponse({"status": 400, "message": "invalid client credentials request"}, status_code=400)
+    token = secrets.token_hex(15)
+    ttl = TOKEN_TTL or 5000000
+    tokens[token] = time.time() + ttl
+    tokens_issued += 1
+    return {"access_token": token, "expires_in": int(ttl), "token_type": "bearer"}
+
+
+@app.post("/revoke-tokens")
+async def revoke_tokens():
+    """Invalidate every issued token, as if they had all expired."""
+    tokens.clear()
+    return {}
+
+
+@app.post("/discord")
+async def discord(request: Request):
+    payload = await request.json()
+    webhooks.append(payload)
+    match = ALERT_PATTERN.search(payload.get("content", ""))
+    started = went_live_at(match.group(1)) if match else None
+    if started is not None:
+        detection_latencies.append(time.time() - started)
+    return {}
+
+
+@app.post("/reset")
+async def reset(go_live_window: Optional[float] = None):
+    """Clear all counters and restart the go-live schedule."""
+    global epoch, GO_LIVE_WINDOW, tokens_issued
+    epoch = time.time()
+    if go_live_window is not None:
+        GO_LIVE_WINDOW = go_live_window
+    for state in (buckets, requests_by_client, requests_by_path, responses_by_status, webhooks, detection_latencies):
+        state.clear()
+    tokens_issued = 0
+    return {}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "requests_by_client": dict(requests_by_client),
+        "requests_by_path": dict(requests_by_path),
+        "responses_by_status": {str(status): count for status, count in responses_by_status.items()},
+        "webhooks": len(webhooks),
+        "webhooks_with_embeds": sum(1 for payload in webhooks if payload.get("embeds")),
+        "tokens_issued": tokens_issued,
+        "detection_latencies": detection_latencies,
+    }
+
+
+def main():
+    global LIVE_PERCENT, RATE_LIMIT, LATENCY, ERROR_RATE, GO_LIVE_WINDOW, TOKEN_TTL
+    parser = argparse.ArgumentParser(description="Mock Twitch Helix API and Discord webhook sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--live-percent", type=float, default=LIVE_PERCENT, help="Share of channels reported live")
+    parser.add_argument("--rate-limit", type=int, default=RATE_LIMIT, help="Helix requests per minute per Client-ID")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every Helix response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Helix requests answered with a 500")
+    parser.add_argument("--go-live-window", type=float, default=0.0, help="Seconds over which live channels go live")
+    parser.add_argument("--token-ttl", type=float, default=0.0, help="Seconds issued tokens are valid, 0 to accept any token")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the injected errors")
+    args = parser.parse_args()
+
+    LIVE_PERCENT, RATE_LIMIT = args.live_percent, args.rate_limit
+    LATENCY, ERROR_RATE, GO_LIVE_WINDOW = args.latency_ms / 1000, args.error_rate, args.go_live_window
+    TOKEN_TTL = args.token_ttl
+    rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Query the troubleshooting records written by the bot and server (see twitch/dumps.py).
+
+Usage:
+    python tools/read_dumps.py --channel somechannel --since 2024-01-01T00:00
+    python tools/read_dumps.py --status null --count
+    python tools/read_dumps.py --limit 5 --pretty
+"""
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from twitch.dumps import DUMP_DIR, dump_files, read_records
+
+
+def parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query troubleshooting dump records")
+    parser.add_argument("--dir", default=DUMP_DIR, help="Directory with the dump files")
+    parser.add_argument("--channel", help="Only records for this channel (case-insensitive)")
+    parser.add_argument("--status", help="Only records with this status, e.g. null")
+    parser.add_argument("--since", type=parse_time, help="Only records at or after this ISO time (UTC if no offset)")
+    parser.add_argument("--until", type=parse_time, help="Only records before this ISO time (UTC if no offset)")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    parser.add_argument("--count", action="store_true", help="Print the number of matching records per channel instead")
+    parser.add_argument("--pretty", action="store_true", help="Indent the printed records")
+    args = parser.parse_args()
+
+    channel = args.channel.lower() if args.channel else None
+    counts: Counter = Counter()
+    matched = 0
+    for path in dump_files(args.dir):
+        for record in read_records(path):
+            if channel and record.get("channel", "").lower() != channel:
+                continue
+            if args.status and record.get("status") != args.status:
+                continue
+            if args.since or args.until:
+                recorded = parse_time(record["time"])
+                if (args.since and recorded < args.since) or (args.until and recorded >= args.until):
+                    continue
+
+            matched += 1
+            if args.count:
+                counts[record.get("channel")] += 1
+            else:
+                print(json.dumps(record, indent=4 if args.pretty else None))
+            if args.limit and matched >= args.limit:
+                break
+        if args.limit and matched >= args.limit:
+            break
+
+    if args.count:
+        for name, count in counts.most_common():
+            print(f"{count:>8} {name}")
+        print(f"{matched:>8} total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Run several sharded bot.py workers against the local mock Helix server and check
+that together they cover CHANNEL_LIST exactly once.
+
+Usage:
+    python tools/run_shards.py --workers 3 --channels 5000 --duration 20
+"""
+import os
+import sys
+import time
+import socket
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Set
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from twitch.sharding import HashRing, shard_save_file
+from twitch.store import StateStore
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout} seconds")
+
+
+def read_shard(db_path: str) -> Set[str]:
+    if not os.path.exists(db_path):
+        return set()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return {name for (name,) in conn.execute("SELECT name FROM channels")}
+    finally:
+        conn.close()
+
+
+def moved_fraction(workers: List[str], names: List[str]) -> float:
+    """Share of channels that change owner when one more worker joins."""
+    before, after = HashRing(workers), HashRing(workers + [f"worker-{len(workers)}"])
+    return sum(before.worker_for(name) != after.worker_for(name) for name in names) / len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run sharded workers against a mock Helix server")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--channels", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to let the workers run")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    workers = [f"worker-{index}" for index in range(args.workers)]
+    names = [f"channel{index}" for index in range(args.channels)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        channel_list = os.path.join(workdir, "channels.txt")
+        with open(channel_list, "w") as f:
+            f.write("\n".join(names) + "\n")
+        save_file = os.path.join(workdir, "save_data.json")
+
+        mock = subprocess.Popen([sys.executable, os.path.join(ROOT, "tools", "mock_helix.py"), "--port", str(args.port)])
+        processes: List[subprocess.Popen] = []
+        try:
+            wait_for_port(args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+            for worker in workers:
+                env = dict(
+                    os.environ,
+                    DISCORD_WEBHOOK_URL=f"{base_url}/discord",
+                    TWITCH_ROLE_ID="1",
+                    CHANNEL_LIST=channel_list,
+                    UPDATE_DELAY_MIN="0.1",
+                    SAVE_FILE=save_file,
+                    CLIENT_ID=worker,
+                    AUTH_KEY="mock",
+                    HELIX_URL=f"{base_url}/helix",
+                    HTTP2="false",
+                    SHARD_WORKERS=",".join(workers),
+                    SHARD_ID=worker,
+                )
+                log = open(os.path.join(workdir, f"{worker}.out"), "w")
+                processes.append(
+                    subprocess.Popen([sys.executable, os.path.join(ROOT, "bot.py")], env=env, cwd=workdir, stdout=log, stderr=log)
+                )
+
+            time.sleep(args.duration)
+            stats = httpx.get(f"{base_url}/stats").json()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+            mock.terminate()
+            mock.wait(timeout=10)
+
+        shards: Dict[str, Set[str]] = {
+            worker: read_shard(StateStore.path_for(shard_save_file(save_file, worker))) for worker in workers
+        }
+
+    covered = set().union(*shards.values())
+    overlap = sum(len(shard) for shard in shards.values()) - len(covered)
+    for worker in workers:
+        requests = stats["requests_by_client"].get(worker, 0)
+        print(f"{worker}: {len(shards[worker])} channels, {requests} Helix requests")
+    print(f"covered {len(covered)}/{len(names)} channels, {overlap} owned by more than one worker")
+    print(f"adding a worker would move {moved_fraction(workers, names):.1%} of channels (ideal {1 / (len(workers) + 1):.1%})")
+
+    if covered != set(names) or overlap:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
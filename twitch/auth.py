@@ -0,0 +1,145 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from twitch import codec
+
+logger = logging.getLogger(__name__)
+
+OAUTH_TOKEN_URL: str = os.getenv("OAUTH_TOKEN_URL", "https://id.twitch.tv/oauth2/token")
+TOKEN_REFRESH_MARGIN: float = float(os.getenv("TOKEN_REFRESH_MARGIN_SEC", 600))  # Refresh this long before the token expires
+
+
+class AuthHeaders(dict):
+    """The Client-ID and Authorization headers of a TokenManager, kept up to date in place."""
+
+    def __init__(self, manager: "TokenManager"):
+        super().__init__()
+        self.manager = manager
+
+
+class TokenManager:
+    """
+    App access token for Helix, from the OAuth client credentials flow.
+
+    The token is cached with its expiry and renewed in the background
+    `refresh_margin` seconds before it runs out. `headers` is a single dict that
+    every request can share: it is updated in place, so callers never hold on to
+    a stale token. Concurrent refreshes, e.g. after a burst of 401 responses,
+    share one in-flight token request.
+
+    Without a `client_secret` the `static_token` (AUTH_KEY) is used as is and
+    can't be renewed. With one, a `static_token` is used until `static_expiry`
+    (Unix time), or until it is rejected if that isn't known.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: Optional[str] = None,
+        static_token: Optional[str] = None,
+        static_expiry: Optional[float] = None,
+        token_url: str = OAUTH_TOKEN_URL,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.token: Optional[str] = None
+        self.expires_at: Optional[float] = None  # Monotonic time the token expires, None if unknown
+        self.refreshes = 0
+        self.headers: Dict[str, str] = AuthHeaders(self)
+        self._refreshing: Optional[asyncio.Task] = None
+        self._worker: Optional[asyncio.Task] = None
+        if static_token:
+            expires_in = static_expiry - time.time() if static_expiry else None
+            self._set_token(static_token, expires_in)
+        else:
+            self.headers["Client-ID"] = client_id
+
+    @property
+    def can_refresh(self) -> bool:
+        return bool(self.client_secret)
+
+    def _set_token(self, token: str, expires_in: Optional[float]) -> None:
+        self.token = token
+        self.expires_at = time.monotonic() + expires_in if expires_in is not None else None
+        self.headers.update({"Client-ID": self.client_id, "Authorization": f"Bearer {token}"})
+
+    def expires_in(self) -> Optional[float]:
+        """Seconds until the token expires, None if unknown."""
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+    async def start(self, client: httpx.AsyncClient, background: bool = True) -> None:
+        """Get a first token if needed and, with `background`, keep it fresh until `stop()`."""
+        expires_in = self.expires_in()
+        if self.can_refresh and (self.token is None or (expires_in is not None and expires_in <= self.refresh_margin)):
+            await self.refresh(client)
+        if background and self.can_refresh and self._worker is None:
+            self._worker = asyncio.create_task(self._run(client))
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def refresh(self, client: httpx.AsyncClient, rejected: Optional[str] = None) -> Optional[str]:
+        """
+        Get a new token, or join the request already in flight. Returns the current token.
+
+        Pass the token a 401 came back for as `rejected`: if it was already
+        replaced in the meantime, the newer token is returned without a request.
+        """
+        if rejected is not None and rejected != self.token:
+            return self.token
+        if not self.can_refresh:
+            if rejected is not None:
+                logger.error("Twitch rejected AUTH_KEY and there is no SECRET to get a new token with.")
+            return self.token
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._request_token(client))
+        refreshing = self._refreshing
+        try:
+            # Shielded, so a caller cancelled by the cycle deadline doesn't cancel it for the others
+            await asyncio.shield(refreshing)
+        finally:
+            if refreshing.done() and self._refreshing is refreshing:
+                self._refreshing = None
+        return self.token
+
+    async def _request_token(self, client: httpx.AsyncClient) -> None:
+        response = await client.post(
+            self.token_url,
+            data={"client_id": self.client_id, "client_secret": self.client_secret, "grant_type": "client_credentials"},
+        )
+        response.raise_for_status()
+        payload = codec.loads(response.content)
+        self._set_token(payload["access_token"], float(payload["expires_in"]) if payload.get("expires_in") else None)
+        self.refreshes += 1
+        logger.info(f"Got a new Twitch app access token, valid for {payload.get('expires_in', 'an unknown number of')} seconds.")
+
+    async def _run(self, client: httpx.AsyncClient) -> None:
+        failures = 0
+        while True:
+            expires_in = self.expires_in()
+            if failures:
+                delay = min(300.0, 5.0 * 2 ** failures)
+            elif expires_in is None:
+                delay = self.refresh_margin  # Expiry unknown, check again later; a 401 triggers the refresh meanwhile
+            else:
+                delay = max(expires_in - self.refresh_margin, expires_in / 2)  # Half way for tokens shorter than the margin
+            await asyncio.sleep(max(0.0, delay))
+            if not failures and self.expires_in() is None:
+                continue
+            try:
+                await self.refresh(client)
+                failures = 0
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                failures += 1
+                logger.error(f"Could not refresh the Twitch app access token (attempt {failures}): {e}")
@@ -0,0 +1,107 @@
+import time
+import logging
+
+from twitch import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # For the state gauge
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing.
+
+    After `failure_threshold` failures in a row the circuit opens and `allow()`
+    refuses every call, so callers fail fast instead of each waiting through
+    timeouts and retries. After `reset_timeout` seconds the circuit goes half-open
+    and lets `probes` calls through: a success closes it again, a failure opens it
+    for another `reset_timeout`, doubled on every failed probe up to `max_timeout`.
+
+    A `failure_threshold` of 0 disables the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_timeout: float = 300.0,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.probes = probes
+        self.state = CLOSED
+        self.failures = 0  # Consecutive failures while closed
+        self.opened_at = 0.0  # Monotonic time the circuit last opened
+        self.open_timeout = reset_timeout
+        self.rejected = 0
+        self._probes_in_flight = 0
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through, 0 if it isn't open."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. A call that is allowed must be followed by `record_success()` or `record_failure()`."""
+        if self.failure_threshold <= 0 or self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.retry_in() == 0:
+            self._set_state(HALF_OPEN)
+            logger.info(f"{self.name} circuit half-open, probing with {self.probes} request(s).")
+        if self.state == HALF_OPEN and self._probes_in_flight < self.probes:
+            self._probes_in_flight += 1
+            return True
+        self.rejected += 1
+        metrics.CIRCUIT_REJECTED.inc(name=self.name)
+        return False
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            logger.info(f"{self.name} circuit closed, the probe succeeded.")
+            self._set_state(CLOSED)
+            self.open_timeout = self.reset_timeout
+        self.failures = 0
+
+    def release(self) -> None:
+        """An allowed call ended without an outcome, e.g. it was cancelled."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self.open_timeout = min(self.max_timeout, self.open_timeout * 2)
+            self._open("the probe failed")
+        elif self.state == CLOSED:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open(f"{self.failures} failures in a row")
+
+    def _open(self, reason: str) -> None:
+        self.opened_at = time.monotonic()
+        self.failures = 0
+        self._set_state(OPEN)
+        logger.warning(f"{self.name} circuit open after {reason}, skipping requests for {self.open_timeout:.0f} seconds.")
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[state], name=self.name)
+        if state == OPEN:
+            metrics.CIRCUIT_OPENED.inc(name=self.name)
+
@@ -1,6 +1,12 @@
+import sys
+
+
 class Channel:
+    # Fixed attributes instead of a per-instance __dict__ keep large channel lists small
+    __slots__ = ("name", "live")
+
     def __init__(self, name: str = "", live: bool = False):
-        self.name = name
+        self.name = sys.intern(name)
         self.live = live
 
     def set_live(self) -> None:
@@ -0,0 +1,47 @@
+import os
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool settings, shared by every Twitch and Discord request
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", 10))
+HTTP2: bool = os.getenv("HTTP2", "true").strip().lower() in ("1", "true", "yes")
+
+
+def http2_available() -> bool:
+    """Check whether the optional `h2` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = HTTP_MAX_KEEPALIVE,
+    keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+    timeout: float = HTTP_TIMEOUT,
+    http2: bool = HTTP2,
+) -> httpx.AsyncClient:
+    """
+    Create the long-lived HTTP client used for all outgoing traffic.
+
+    The client keeps connections alive between poll cycles so each request reuses a
+    warm TCP+TLS connection. The owner is responsible for closing it with `aclose()`.
+    """
+    if http2 and not http2_available():
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1.")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
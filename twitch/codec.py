@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from twitch.lazy import optional_import
+
+logger = logging.getLogger(__name__)
+
+JSON_CODEC: str = os.getenv("JSON_CODEC", "auto").strip().lower()  # auto, msgspec, orjson or json
+JSON_PRETTY: bool = os.getenv("JSON_PRETTY", "false").strip().lower() in ("1", "true", "yes")  # Indent JSON files written to disk
+
+# Optional, loaded on first use: msgspec is the fastest decoder with typed schemas, orjson a fast drop-in for json
+msgspec = optional_import("msgspec")
+orjson = optional_import("orjson")
+
+
+def available_backends() -> List[str]:
+    """The installed codecs, fastest first."""
+    return [name for name, module in (("msgspec", msgspec), ("orjson", orjson), ("json", json)) if module is not None]
+
+
+def _pick_backend(name: str) -> str:
+    backends = available_backends()
+    if name in backends:
+        return name
+    if name != "auto":
+        logger.warning(f"JSON_CODEC '{name}' is not installed, using '{backends[0]}' instead.")
+    return backends[0]
+
+
+BACKEND: str = _pick_backend(JSON_CODEC)
+
+
+_msgspec_codec: Optional[Tuple[Dict[str, Any], Any]] = None
+
+
+def _msgspec() -> Tuple[Dict[str, Any], Any]:
+    """The typed msgspec decoders and the encoder, built on first use."""
+    global _msgspec_codec
+    if _msgspec_codec is not None:
+        return _msgspec_codec
+
+    class Record(msgspec.Struct):
+        """A decoded Helix object that can be read like the dict it replaces."""
+
+        def get(self, key: str, default: Any = None) -> Any:
+            value = getattr(self, key, None)
+            return default if value is None else value
+
+    class Stream(Record):
+        # Only the fields the bot reads; the rest of the payload is skipped while decoding
+        user_id: Optional[str] = None
+        user_login: Optional[str] = None
+        user_name: Optional[str] = None
+        game_id: Optional[str] = None
+        game_name: Optional[str] = None
+        type: Optional[str] = None
+        title: Optional[str] = None
+        viewer_count: Optional[int] = None
+        started_at: Optional[str] = None
+        thumbnail_url: Optional[str] = None
+
+    class User(Record):
+        id: Optional[str] = None
+        login: Optional[str] = None
+        display_name: Optional[str] = None
+        profile_image_url: Optional[str] = None
+
+    class Game(Record):
+        id: Optional[str] = None
+        name: Optional[str] = None
+        box_art_url: Optional[str] = None
+
+    class StreamsPage(msgspec.Struct):
+        data: List[Stream] = []
+
+    class UsersPage(msgspec.Struct):
+        data: List[User] = []
+
+    class GamesPage(msgspec.Struct):
+        data: List[Game] = []
+
+    decoders = {
+        "streams": msgspec.json.Decoder(StreamsPage),
+        "users": msgspec.json.Decoder(UsersPage),
+        "games": msgspec.json.Decoder(GamesPage),
+    }
+    _msgspec_codec = (decoders, msgspec.json.Encoder())
+    return _msgspec_codec
+
+
+def loads(data: Any, backend: Optional[str] = None) -> Any:
+    """Decode JSON `data` (bytes or str) into plain Python objects."""
+    backend = backend or BACKEND
+    if backend == "msgspec":
+        return msgspec.json.decode(data)
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, pretty: bool = False, backend: Optional[str] = None) -> bytes:
+    """
+    Encode `obj` as compact JSON, or indented by 2 with `pretty` (the only indent
+    orjson supports). Every backend produces the same bytes, non-ASCII as UTF-8.
+    """
+    backend = backend or BACKEND
+    if backend == "msgspec":
+        encoded = _msgspec()[1].encode(obj)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+    if backend == "orjson":
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def decode_data(content: bytes, kind: str, backend: Optional[str] = None) -> List[Any]:
+    """
+    The `data` list of a Helix response of `kind` ("streams", "users" or "games").
+
+    With msgspec only the fields of the matching schema (`Stream`, `User`,
+    `Game`) are decoded, into records that support `.get()` like the
+    dicts the other codecs return.
+    """
+    backend = backend or BACKEND
+    if backend == "msgspec":
+        return _msgspec()[0][kind].decode(content).data
+    return loads(content, backend).get("data", [])
+
+
+def decode_streams(content: bytes, backend: Optional[str] = None) -> List[Any]:
+    return decode_data(content, "streams", backend)
+
+
+def decode_users(content: bytes, backend: Optional[str] = None) -> List[Any]:
+    return decode_data(content, "users", backend)
+
+
+def decode_games(content: bytes, backend: Optional[str] = None) -> List[Any]:
+    return decode_data(content, "games", backend)
@@ -0,0 +1,375 @@
+import os
+import sys
+import time
+import logging
+import traceback
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from twitch import metrics
+from twitch.channel import Channel
+from twitch.lazy import lazy_import
+from twitch.logs import DETAIL_LOG_LEVEL, CycleSummary
+from twitch.registry import ChannelRegistry
+from twitch.sharding import HashRing, load_json_states, load_peer_states, shard_save_file
+from twitch.store import StateStore
+
+if TYPE_CHECKING:  # Only for annotations, so importing this module doesn't load httpx
+    import httpx
+    from twitch.enrich import Enricher
+    from twitch.idcache import BroadcasterIdCache
+    from twitch.notify import WebhookQueue
+    from twitch.ratelimit import RateLimiter
+    from twitch.routes import Router
+    from twitch.scheduler import PollScheduler
+
+# Only loaded once a poll cycle runs, so add-channel.py --help doesn't pay for the HTTP stack
+helix = lazy_import("twitch.helix")
+eventsub = lazy_import("twitch.eventsub")
+
+logger = logging.getLogger(__name__)
+
+EMBED_COLOR: int = 0x9146FF  # Twitch purple
+
+
+def check_env_vars(required_vars: Iterable[str], shard_workers: Optional[List[str]] = None, shard_id: Optional[str] = None) -> None:
+    """Exit if any of `required_vars` is missing, or if SHARD_ID isn't one of SHARD_WORKERS."""
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    if missing_vars:
+        logger.error(f"Missing environment variables: {', '.join(missing_vars)}")
+        sys.exit(1)
+
+    # Sharded mode needs to know which of the workers this is
+    if shard_workers and shard_id not in shard_workers:
+        logger.error(f"SHARD_ID must be one of SHARD_WORKERS ({', '.join(shard_workers)}), got {shard_id!r}")
+        sys.exit(1)
+
+
+def log_error(e: Exception) -> None:
+    """Logs detailed error information including function and line number."""
+    tb_lines = traceback.format_exception(e.__class__, e, e.__traceback__)
+    logger.error("".join(tb_lines))
+
+
+def get_channels(filename: str) -> List[str]:
+    """Read a list of streamers from a file."""
+    try:
+        with open(filename, "r") as f:
+            streamers = [line.strip() for line in f if line.strip()]
+            logger.info(f"Loaded {len(streamers)} streamers from {filename}.")
+            return streamers
+    except FileNotFoundError as e:
+        log_error(e)
+        logger.error(f"Error: The file {filename} does not exist.")
+        return []
+    except Exception as e:
+        log_error(e)
+        logger.error(f"An unexpected error occurred while reading {filename}: {e}")
+        return []
+
+
+def save_data(channels: Iterable[Channel], store: StateStore) -> None:
+    """Save the channels whose status changed to the state store."""
+    try:
+        changed = store.save(channels)
+        if changed:
+            logger.info(f"Saved {changed} changed channels to {store.path}.")
+    except Exception as e:
+        log_error(e)
+        logger.error(f"Error saving data to {store.path}: {e}")
+
+
+def load_save_data(store: StateStore) -> ChannelRegistry:
+    """Load channel statuses from the state store."""
+    try:
+        channels = ChannelRegistry(store.load())
+        if not channels:
+            logger.warning("No previous data found, starting fresh.")
+            return channels
+        logger.info(f"Loaded {len(channels)} channels from {store.path}.")
+        return channels
+    except Exception as e:
+        log_error(e)
+        logger.error(f"An unexpected error occurred while loading {store.path}: {e}")
+        return ChannelRegistry()
+
+
+def alert_message(role_id: Optional[str], channel_name: str, status: str) -> str:
+    """The Discord message announcing that `channel_name` is `status` ("live" or "offline"), mentioning `role_id` if set."""
+    detect_time = int(time.time())
+    mention = f"<@&{role_id}> " if role_id else ""
+    if status == "live":
+        return f"{mention}<t:{detect_time}:F> <t:{detect_time}:R> - [{channel_name}](https://www.twitch.tv/{channel_name}) is {status}!"
+    return f"{mention}<t:{detect_time}> <t:{detect_time}:R> - {channel_name} is {status}!"
+
+
+def alert_embed(channel_name: str, details: dict) -> dict:
+    """A Discord embed for a live alert from the details of an Enricher. Missing details are left out."""
+    url = f"https://www.twitch.tv/{channel_name}"
+    embed = {"title": details.get("title") or f"{channel_name} is live!", "url": url, "color": EMBED_COLOR}
+    author = {"name": details.get("user_name") or channel_name, "url": url}
+    if details.get("profile_image_url"):
+        author["icon_url"] = details["profile_image_url"]
+    embed["author"] = author
+    fields = []
+    if details.get("game_name"):
+        fields.append({"name": "Game", "value": details["game_name"], "inline": True})
+    if details.get("viewer_count") is not None:
+        fields.append({"name": "Viewers", "value": str(details["viewer_count"]), "inline": True})
+    if fields:
+        embed["fields"] = fields
+    if details.get("thumbnail_url"):
+        embed["image"] = {"url": details["thumbnail_url"]}
+    if details.get("box_art_url"):
+        embed["thumbnail"] = {"url": details["box_art_url"]}
+    if details.get("started_at"):
+        embed["timestamp"] = details["started_at"]
+    return embed
+
+
+def send_webhook(
+    notifier: "WebhookQueue",
+    role_id: Optional[str],
+    channel_name: str,
+    status: str,
+    route_name: Optional[str] = None,
+    details: Optional[dict] = None,
+) -> bool:
+    """Queue a webhook notification to Discord, with an embed if there are `details`. Returns immediately, False if it was dropped."""
+    description = f"{status} status for {channel_name}" + (f" ({route_name})" if route_name else "")
+    try:
+        payload = {"content": alert_message(role_id, channel_name, status)}
+        if details:
+            payload["embeds"] = [alert_embed(channel_name, details)]
+        return notifier.enqueue(payload, description)
+    except Exception as e:
+        log_error(e)
+        logger.error(f"Failed to queue webhook for {channel_name}: {e}")
+        return False
+
+
+def load_seed_states(names: Iterable[str], hash_ring: HashRing, shard_id: str, save_file: str) -> Dict[str, bool]:
+    """
+    The last known state of channels new to shard `shard_id`: from the other
+    workers' stores, else from the unsharded store (where a single-process
+    deployment and add-channel.py keep them), else from a legacy JSON save file.
+    """
+    names = list(names)
+    sources = [StateStore.path_for(shard_save_file(save_file, worker)) for worker in hash_ring.workers if worker != shard_id]
+    sources.append(StateStore.path_for(save_file))
+    states = load_peer_states(sources, names)
+    if save_file.endswith(".json"):
+        states.update(load_json_states(save_file, [name for name in names if name not in states]))
+    return states
+
+
+def load_channels(
+    store: StateStore,
+    channel_list_file: str,
+    hash_ring: Optional[HashRing] = None,
+    shard_id: Optional[str] = None,
+    save_file: Optional[str] = None,
+) -> ChannelRegistry:
+    """
+    Load the channels to monitor: the saved ones, or CHANNEL_LIST on a fresh start.
+
+    In sharded mode only the channels `shard_id` owns on `hash_ring`. Channels new
+    to this worker take their last state from `load_seed_states()`, so neither
+    switching to sharding nor a channel moving between workers re-alerts it.
+    """
+    saved = load_save_data(store)
+    names = get_channels(channel_list_file)
+    if not hash_ring:
+        channels = saved or ChannelRegistry(Channel(name=channel) for channel in names)
+        # Reloads compare against this, so the saved channels that aren't on the list are kept
+        channels.mark_listed(names)
+        return channels
+
+    # CHANNEL_LIST is the source of truth for which channels exist, the store only for their state
+    owned = hash_ring.owned_by(shard_id, names)
+    moved_in = load_seed_states([name for name in owned if name not in saved], hash_ring, shard_id, save_file)
+    moved_out = set(saved.names()) - set(owned)
+    if moved_out:
+        store.remove(moved_out)
+
+    logger.info(
+        f"Shard {shard_id}: owns {len(owned)} channels ({len(moved_in)} new ones with a known state, {len(moved_out)} handed off)."
+    )
+    channels = ChannelRegistry(saved.get(name) or Channel(name, moved_in.get(name, False)) for name in owned)
+    channels.mark_listed(owned)
+    return channels
+
+
+def reload_channel_list(
+    channels: ChannelRegistry,
+    channel_list_file: str,
+    scheduler: "PollScheduler",
+    store: StateStore,
+    hash_ring: Optional[HashRing] = None,
+    shard_id: Optional[str] = None,
+    save_file: Optional[str] = None,
+) -> Tuple[List[Channel], List[Channel]]:
+    """
+    Apply edits to CHANNEL_LIST to the running monitor, keeping the state of unchanged channels.
+    Only the names deleted from the file are removed, see `ChannelRegistry.sync()`.
+    In sharded mode added channels start from their last known state, see `load_seed_states()`.
+
+    Returns:
+        tuple: (added, removed) channels, both empty if the file is missing or empty.
+    """
+    names = get_channels(channel_list_file)
+    if not names:
+        logger.warning(f"{channel_list_file} is missing or empty, keeping the current {len(channels)} channels.")
+        return [], []
+    if hash_ring:
+        names = hash_ring.owned_by(shard_id, names)
+
+    added, removed = channels.sync(names)
+    if hash_ring and added:
+        seeded = load_seed_states((channel.name for channel in added), hash_ring, shard_id, save_file)
+        for channel in added:
+            channel.live = seeded.get(channel.name, False)
+    for channel in added:
+        scheduler.add(channel.name, live=channel.live)
+    for channel in removed:
+        scheduler.remove(channel.name)
+    if removed:
+        store.remove(channel.name for channel in removed)
+    logger.info(f"Reloaded {channel_list_file}: {len(added)} channels added, {len(removed)} removed.")
+    return added, removed
+
+
+def keep_start_history(scheduler: "PollScheduler", store: StateStore) -> None:
+    """
+    Restore the go-live times `scheduler` learned in earlier runs from `store`,
+    and save every new one there, so a restart doesn't forget the usual start windows.
+    """
+    for name, starts in store.load_starts().items():
+        if name in scheduler:
+            for started_at in starts:
+                scheduler.record_start(name, started_at)
+
+    def save_start(name: str, started_at: float) -> None:
+        try:
+            store.save_start(name, started_at, keep=scheduler.history)
+        except Exception as e:
+            log_error(e)
+            logger.error(f"Error saving the start time of {name} to {store.path}: {e}")
+
+    scheduler.on_start = save_start
+
+
+def update_channel_status(
+    channels: ChannelRegistry,
+    channel: Channel,
+    is_channel_live: bool,
+    router: "Router",
+    details: Optional[dict] = None,
+    started_at: Optional[str] = None,
+    log_level: int = DETAIL_LOG_LEVEL,
+) -> Optional[bool]:
+    """Apply a status check to `channel` and alert its routes. Returns the new live state if it changed, otherwise None."""
+    if is_channel_live and not channel.live:
+        logger.log(log_level, f"{channel.name} is now live!")
+        channel.set_live()
+        channels.touch()
+        router.notify(channel.name, "live", details)
+        metrics.observe_detection_lag(eventsub.parse_timestamp(started_at))
+        return True
+    elif is_channel_live and channel.live:
+        logger.log(log_level, f"{channel.name} is live.")
+    elif not is_channel_live and channel.live:
+        logger.log(log_level, f"{channel.name} is now offline!")
+        channel.set_offline()
+        channels.touch()
+        router.notify(channel.name, "offline")
+        return False
+    elif not is_channel_live and not channel.live:
+        logger.log(log_level, f"{channel.name} is offline.")
+    return None
+
+
+async def run_poll_cycle(
+    client: "httpx.AsyncClient",
+    channels: ChannelRegistry,
+    scheduler: "PollScheduler",
+    store: StateStore,
+    router: "Router",
+    headers: Dict[str, str],
+    id_cache: "BroadcasterIdCache",
+    limiter: "RateLimiter",
+    enricher: Optional["Enricher"] = None,
+    on_anomaly: Optional[Callable[[str, dict, str], None]] = None,
+    on_change: Optional[Callable[[Channel, bool, Optional[str]], None]] = None,
+    client_id: Optional[str] = None,
+    auth_key: Optional[str] = None,
+    concurrency: int = 8,
+    deadline: Optional[float] = None,
+) -> Optional[CycleSummary]:
+    """
+    One poll cycle: check the channels `scheduler` says are due, alert their
+    transitions, save the ones that changed and log a summary.
+
+    Channels that went live get embed details from `enricher`, with one batch of
+    /users and /games lookups for the cache misses; without one, alerts are plain.
+    `on_change(channel, live, started_at)` is called after every transition.
+
+    Returns:
+        CycleSummary: What happened, or None if no channel was due.
+    """
+    due_names = scheduler.pop_due()
+    if not due_names:
+        return None
+
+    cycle_started = time.monotonic()
+    summary = CycleSummary()
+    live_streams: Dict[str, dict] = {}  # Helix payloads of the live channels, for started_at
+    # Only this cycle's requests, not those of e.g. an EventSub sync running alongside
+    with helix.count_errors() as request_errors:
+        statuses = await helix.get_live_statuses(
+            client,
+            due_names,
+            client_id=client_id,
+            auth_key=auth_key,
+            headers=headers,
+            on_anomaly=on_anomaly,
+            concurrency=concurrency,
+            deadline=deadline,
+            limiter=limiter,
+            id_cache=id_cache,
+            on_stream=live_streams.__setitem__,
+        )
+        went_live = {
+            name: live_streams[name] for name in due_names
+            if statuses.get(name) and not channels.get(name).live and name in live_streams
+        }
+        alert_details = await enricher.enrich(client, headers, went_live, limiter=limiter) if enricher and went_live else {}
+    summary.errors = sum(request_errors.values())
+
+    # Apply results in due order, so transitions are alerted deterministically
+    for name in due_names:
+        channel = channels.get(name)
+        is_channel_live = statuses.get(name)
+        started_at = live_streams.get(name, {}).get("started_at")
+        stream_start = eventsub.parse_timestamp(started_at)
+        scheduler.record(name, is_channel_live, started_at=stream_start.timestamp() if stream_start else None)
+        summary.checked(is_channel_live)
+        if is_channel_live is None:
+            metrics.CHANNELS_CHECKED.inc(result="unknown")
+            logger.log(DETAIL_LOG_LEVEL, f"{channel.name}'s channel status not found!")
+            continue
+        metrics.CHANNELS_CHECKED.inc(result="live" if is_channel_live else "offline")
+        changed = update_channel_status(channels, channel, is_channel_live, router, alert_details.get(name), started_at)
+        if changed is not None:
+            summary.transition(channel.name, changed)
+            if on_change:
+                on_change(channel, changed, started_at)
+
+    save_data([channels.get(name) for name in due_names], store)
+    id_cache.save()
+    metrics.CYCLE_DURATION.observe(time.monotonic() - cycle_started)
+    cache_stats = id_cache.stats()
+    logger.log(DETAIL_LOG_LEVEL, f"Broadcaster ID cache: {cache_stats['size']} IDs, {cache_stats['hit_rate']:.1%} hit rate.")
+    budget = limiter.budget()
+    logger.log(DETAIL_LOG_LEVEL, f"Helix rate limit budget: {budget['remaining']}/{budget['limit']} requests remaining.")
+    logger.info(summary.line(id_hit_rate=f"{cache_stats['hit_rate']:.2f}", budget=budget["remaining"], circuit=helix.HELIX_BREAKER.state))
+    return summary
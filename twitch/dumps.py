@@ -0,0 +1,167 @@
+import os
+import gzip
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import IO, Iterator, List, Optional
+
+from twitch import codec, metrics
+
+logger = logging.getLogger(__name__)
+
+# Troubleshooting dumps of unexpected Helix responses
+DUMP_DIR: str = os.getenv("DUMP_DIR", os.path.join("troubleshooting", "status-responses"))
+DUMP_MAX_BYTES: int = int(float(os.getenv("DUMP_MAX_MB", 8)) * 1024 * 1024)  # Rotate after this many compressed bytes
+DUMP_MAX_AGE: float = float(os.getenv("DUMP_ROTATE_MIN", 60)) * 60  # Rotate after this many seconds
+DUMP_QUEUE_SIZE: int = int(os.getenv("DUMP_QUEUE_SIZE", 10000))  # Records waiting to be written before new ones are dropped
+
+FILE_PREFIX = "status-responses-"
+FILE_SUFFIX = ".ndjson.gz"
+
+
+class DumpSink:
+    """
+    Buffered, append-only sink for troubleshooting records.
+
+    `record()` only puts the record on a bounded queue and never blocks; when the
+    queue is full the record is dropped and counted. A background thread writes
+    the queued records in batches as gzip-compressed NDJSON (one JSON object per
+    line) and starts a new file once the current one reaches `max_bytes` or is
+    older than `max_age` seconds, so a burst of anomalies costs a few appends
+    instead of a file per record.
+
+    The writer is a thread rather than an asyncio task because compressing and
+    writing files blocks, and asyncio has no non-blocking file I/O.
+    """
+
+    def __init__(
+        self,
+        directory: str = DUMP_DIR,
+        max_bytes: int = DUMP_MAX_BYTES,
+        max_age: float = DUMP_MAX_AGE,
+        maxsize: int = DUMP_QUEUE_SIZE,
+        flush_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._raw: Optional[IO[bytes]] = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._opened_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dump-sink", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write out what is queued (for up to `timeout` seconds) and stop the writer."""
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"Dump queue is still full, stopping with {self.queue.qsize()} records unwritten.")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, channel_name: str, content: dict, status: str) -> bool:
+        """Queue a troubleshooting record. Returns False if it was dropped."""
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "channel": channel_name,
+            "status": status,
+            "content": content,
+        }
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            metrics.DUMP_RECORDS.inc(result="dropped")
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Dump queue is full, {self.dropped} troubleshooting records dropped so far.")
+            return False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                batch: List[dict] = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not None]
+            if batch:
+                self._write(batch)
+            elif self._file and time.time() - self._opened_at >= self.max_age:
+                self._close_file()
+        self._close_file()
+
+    def _write(self, batch: List[dict]) -> None:
+        try:
+            self._rotate_if_needed()
+            data = b"".join(codec.dumps(entry) + b"\n" for entry in batch)
+            self._file.write(data)
+            self._file.flush()  # Sync flush, so readers see complete records of a file still being written
+            self.written += len(batch)
+            metrics.DUMP_RECORDS.inc(len(batch), result="written")
+        except Exception as e:
+            self.errors += len(batch)
+            metrics.DUMP_RECORDS.inc(len(batch), result="failed")
+            logger.error(f"Could not write {len(batch)} troubleshooting records to {self.directory}: {e}")
+            self._close_file()
+
+    def _rotate_if_needed(self) -> None:
+        if self._file and (self._raw.tell() >= self.max_bytes or time.time() - self._opened_at >= self.max_age):
+            self._close_file()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{FILE_PREFIX}{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}{FILE_SUFFIX}"
+            self._raw = open(os.path.join(self.directory, name), "ab")
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+            self._opened_at = time.time()
+
+    def _close_file(self) -> None:
+        if self._file:
+            try:
+                self._file.close()
+                self._raw.close()
+            except OSError as e:
+                logger.error(f"Could not close troubleshooting dump file: {e}")
+            self._file = self._raw = None
+
+
+def dump_files(directory: str = DUMP_DIR) -> List[str]:
+    """The dump files in `directory`, oldest first."""
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Read the records of a dump file, including one that is still being written."""
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                if line.endswith("\n"):
+                    yield codec.loads(line)
+        except EOFError:
+            pass  # The writer hasn't closed this file yet
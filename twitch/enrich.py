@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+import httpx
+
+from twitch import metrics
+from twitch.breaker import CircuitOpenError
+from twitch.helix import fetch_games, fetch_users
+from twitch.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+ENRICH_CACHE_SIZE: int = int(os.getenv("ENRICH_CACHE_SIZE", 10000))  # Max entries per cache
+USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL_SEC", 24 * 3600))  # Profile images rarely change
+GAME_CACHE_TTL: float = float(os.getenv("GAME_CACHE_TTL_SEC", 7 * 24 * 3600))  # Neither do game names and box art
+ENRICH_TIMEOUT: float = float(os.getenv("ENRICH_TIMEOUT_SEC", 5))  # Longest an alert waits for missing details
+THUMBNAIL_SIZE = ("440", "248")
+BOX_ART_SIZE = ("144", "192")
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire `ttl` seconds after they were set.
+
+    When full, the least recently used entry makes room for a new one. Expired
+    entries are dropped when they are looked up.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (monotonic expiry, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def peek(self, key: Hashable) -> Any:
+        """The value of `key`, or None if it is missing or expired, without touching the counters or the LRU order."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            metrics.ENRICH_CACHE.inc(cache=self.name, result="miss")
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        metrics.ENRICH_CACHE.inc(cache=self.name, result="hit")
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def sized(url: Optional[str], size: tuple) -> Optional[str]:
+    """Fill the {width} and {height} placeholders of a Helix image URL."""
+    if not url:
+        return None
+    return url.replace("{width}", size[0]).replace("{height}", size[1])
+
+
+class Enricher:
+    """
+    Alert details for channels that went live: title, game, viewer count and
+    thumbnail from the stream payload the poller already fetched, plus profile
+    images and game box art from two TTL/LRU caches.
+
+    Cache misses of every channel that went live in a cycle are fetched together,
+    one /users and one /games request per 100 IDs, so a busy go-live window costs
+    a handful of requests instead of two per alert. IDs Twitch doesn't know are
+    cached as empty entries so they aren't looked up again until they expire.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ENRICH_CACHE_SIZE,
+        user_ttl: float = USER_CACHE_TTL,
+        game_ttl: float = GAME_CACHE_TTL,
+        timeout: float = ENRICH_TIMEOUT,
+    ):
+        self.users = TTLCache("users", maxsize, user_ttl)
+        self.games = TTLCache("games", maxsize, game_ttl)
+        self.timeout = timeout
+
+    async def enrich(
+        self,
+        client: httpx.AsyncClient,
+        headers: Dict[str, str],
+        streams: Dict[str, Any],
+        limiter: Optional[RateLimiter] = None,
+    ) -> Dict[str, dict]:
+        """
+        The alert details of every channel in `streams` ({channel_name: Helix
+        stream payload}). If the missing profiles and games can't be fetched within
+        `timeout`, the details are built from the stream payloads alone.
+        """
+        user_ids = [user_id for user_id in self._ids(streams.values(), "user_id") if self.users.get(user_id) is None]
+        game_ids = [game_id for game_id in self._ids(streams.values(), "game_id") if self.games.get(game_id) is None]
+        if user_ids or game_ids:
+            try:
+                await asyncio.wait_for(self._fetch(client, headers, user_ids, game_ids, limiter), self.timeout)
+            except (httpx.HTTPError, CircuitOpenError, asyncio.TimeoutError) as e:
+                logger.warning(f"Could not fetch {len(user_ids)} profiles and {len(game_ids)} games for alerts, sending them without: {e!r}")
+            except Exception as e:
+                # Best effort: e.g. an undecodable or malformed payload must not stop the alerts
+                logger.error(f"Unexpected error while fetching profiles and games for alerts, sending them without: {e!r}")
+        return {name: self.details(stream) for name, stream in streams.items()}
+
+    @staticmethod
+    def _ids(streams: Iterable[Any], field: str) -> Iterable[str]:
+        return dict.fromkeys(stream.get(field) for stream in streams if stream.get(field))
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, headers: Dict[str, str], user_ids: list, game_ids: list, limiter: Optional[RateLimiter]
+    ) -> None:
+        if user_ids:
+            found = {user.get("id"): user for user in await fetch_users(client, headers, user_ids, limiter)}
+            for user_id in user_ids:
+                user = found.get(user_id)
+                self.users.set(user_id, {"display_name": user.get("display_name"), "profile_image_url": user.get("profile_image_url")} if user else {})
+        if game_ids:
+            found = {game.get("id"): game for game in await fetch_games(client, headers, game_ids, limiter)}
+            for game_id in game_ids:
+                game = found.get(game_id)
+                self.games.set(game_id, {"name": game.get("name"), "box_art_url": game.get("box_art_url")} if game else {})
+
+    def details(self, stream: Any) -> dict:
+        """The alert details of one stream payload, with whatever the caches hold for it. Never requests anything."""
+        user = self.users.peek(stream.get("user_id")) or {}
+        game = self.games.peek(stream.get("game_id")) or {}
+        thumbnail = sized(stream.get("thumbnail_url"), THUMBNAIL_SIZE)
+        return {
+            "user_name": stream.get("user_name") or user.get("display_name"),
+            "title": stream.get("title"),
+            "game_name": stream.get("game_name") or game.get("name"),
+            "viewer_count": stream.get("viewer_count"),
+            "started_at": stream.get("started_at"),
+            # Discord caches images by URL, so a fresh query string shows this stream's thumbnail and not the last one's
+            "thumbnail_url": f"{thumbnail}?t={int(time.time())}" if thumbnail else None,
+            "profile_image_url": user.get("profile_image_url"),
+            "box_art_url": sized(game.get("box_art_url"), BOX_ART_SIZE),
+        }
+
+    def stats(self) -> dict:
+        return {"users": self.users.stats(), "games": self.games.stats()}
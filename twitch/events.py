@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Optional, Set, Tuple
+
+from twitch import codec, metrics
+
+logger = logging.getLogger(__name__)
+
+EVENT_HISTORY: int = int(os.getenv("EVENT_HISTORY", 1000))  # Events kept for clients resuming with Last-Event-ID
+EVENT_CLIENT_BUFFER: int = int(os.getenv("EVENT_CLIENT_BUFFER", 100))  # Undelivered events per client before it is dropped
+EVENT_KEEPALIVE: float = float(os.getenv("EVENT_KEEPALIVE_SEC", 15))  # Comment line sent to idle streams, so proxies keep them open
+RETRY_MS: int = 3000  # How long EventSource clients wait before reconnecting
+
+
+def format_event(event_id: Optional[str], event_type: str, data: bytes) -> bytes:
+    """A Server-Sent Events message. `data` must be a single line, like compact JSON."""
+    header = f"id: {event_id}\n" if event_id else ""
+    return f"{header}event: {event_type}\ndata: ".encode() + data + b"\n\n"
+
+
+class Subscriber:
+    """One connected client: a bounded buffer of encoded events, and whether it fell behind."""
+
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def offer(self, message: bytes) -> bool:
+        """Buffer `message`, False if the buffer is full."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self) -> None:
+        """Discard the buffer and end the stream; the client resumes from the last event it got."""
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventBroker:
+    """
+    Broadcasts status changes and cycle summaries to any number of stream clients.
+
+    `publish()` encodes an event once and only ever does a non-blocking put into
+    every client's bounded buffer, so the monitor never waits for a client. A
+    client whose buffer is full is disconnected instead of slowing anyone down.
+
+    The last `history` events are kept, so a client that reconnects with the ID
+    of the last event it got (Last-Event-ID) receives the ones it missed. IDs
+    carry the broker's start time; a client resuming from an earlier run, or from
+    further back than the history, gets a `reset` event telling it to reload the
+    full state from GET /channels.
+    """
+
+    def __init__(self, history: int = EVENT_HISTORY, client_buffer: int = EVENT_CLIENT_BUFFER):
+        self.client_buffer = client_buffer
+        self.epoch = str(int(time.time()))
+        self.last_seq = 0
+        self.history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self.subscribers: Set[Subscriber] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event_type: str, data: dict) -> str:
+        """Send an event to every subscriber. Returns its ID."""
+        self.last_seq += 1
+        event_id = f"{self.epoch}-{self.last_seq}"
+        message = format_event(event_id, event_type, codec.dumps(data))
+        self.history.append((self.last_seq, message))
+        self.published += 1
+        metrics.EVENTS_PUBLISHED.inc(type=event_type)
+        for subscriber in list(self.subscribers):
+            if not subscriber.offer(message):
+                self._drop(subscriber)
+        return event_id
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        subscriber.drop()
+        self.dropped += 1
+        metrics.EVENT_CLIENTS_DROPPED.inc()
+        logger.warning(f"Dropped an event stream client that fell {self.client_buffer} events behind.")
+
+    def _missed(self, last_event_id: Optional[str]) -> Optional[list]:
+        """The events after `last_event_id`, or None if they can't all be replayed."""
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.last_seq:
+            return None
+        seq = int(seq)
+        if seq < self.last_seq and (not self.history or self.history[0][0] > seq + 1):
+            return None  # Some of the missed events already left the history
+        return [message for event_seq, message in self.history if event_seq > seq]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """A new subscriber, with the events missed since `last_event_id` already in its buffer."""
+        subscriber = Subscriber(self.client_buffer)
+        missed = self._missed(last_event_id)
+        if missed is None or len(missed) >= self.client_buffer:
+            subscriber.offer(format_event(f"{self.epoch}-{self.last_seq}", "reset", codec.dumps({"reason": "missed events"})))
+        else:
+            for message in missed:
+                subscriber.offer(message)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """End every stream, e.g. on shutdown."""
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+            subscriber.drop()
+
+    async def stream(self, subscriber: Subscriber, keepalive: float = EVENT_KEEPALIVE) -> AsyncIterator[bytes]:
+        """The Server-Sent Events body for `subscriber`, until it is dropped or the client goes away."""
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "last_event_id": f"{self.epoch}-{self.last_seq}",
+            "history": len(self.history),
+        }
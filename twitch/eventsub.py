@@ -0,0 +1,218 @@
+import hmac
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from twitch import codec
+from twitch.helix import fetch_user_ids, helix_get, helix_request
+from twitch.idcache import BroadcasterIdCache
+from twitch.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Request headers sent by Twitch with every EventSub webhook message
+MESSAGE_ID_HEADER = "Twitch-Eventsub-Message-Id"
+MESSAGE_TIMESTAMP_HEADER = "Twitch-Eventsub-Message-Timestamp"
+MESSAGE_SIGNATURE_HEADER = "Twitch-Eventsub-Message-Signature"
+MESSAGE_TYPE_HEADER = "Twitch-Eventsub-Message-Type"
+
+# Values of the message type header
+MESSAGE_TYPE_VERIFICATION = "webhook_callback_verification"
+MESSAGE_TYPE_NOTIFICATION = "notification"
+MESSAGE_TYPE_REVOCATION = "revocation"
+
+SUBSCRIPTION_TYPES: Tuple[str, ...] = ("stream.online", "stream.offline")
+MAX_MESSAGE_AGE: float = 600.0  # Twitch recommends rejecting messages older than 10 minutes
+
+
+def sign(secret: str, message_id: str, timestamp: str, body: bytes) -> str:
+    """Compute the `sha256=<hex>` signature Twitch sends for a message."""
+    message = message_id.encode() + timestamp.encode() + body
+    return "sha256=" + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, message_id: str, timestamp: str, body: bytes, signature: str) -> bool:
+    """Check the HMAC signature of an EventSub message in constant time."""
+    return hmac.compare_digest(sign(secret, message_id, timestamp, body), signature or "")
+
+
+def parse_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parse an RFC 3339 timestamp as sent by Twitch (which may carry nanoseconds)."""
+    try:
+        timestamp = timestamp.rstrip("Z")
+        if "." in timestamp:
+            whole, fraction = timestamp.split(".", 1)
+            timestamp = f"{whole}.{fraction[:6]}"
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+    except (AttributeError, ValueError):
+        return None
+
+
+def is_fresh(timestamp: str, max_age: float = MAX_MESSAGE_AGE) -> bool:
+    """Reject messages older than `max_age` seconds to protect against replays."""
+    sent_at = parse_timestamp(timestamp)
+    if sent_at is None:
+        return False
+    return abs((datetime.now(timezone.utc) - sent_at).total_seconds()) <= max_age
+
+
+class MessageDeduper:
+    """
+    Remembers the last `maxlen` handled message IDs, since Twitch may deliver a
+    message more than once. A message is only remembered once it was handled, so
+    Twitch's retry of a message whose handling failed is handled again.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self.maxlen = maxlen
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def seen(self, message_id: str) -> bool:
+        """Return True if `message_id` was already handled."""
+        if message_id in self._seen:
+            self._seen.move_to_end(message_id)
+            return True
+        return False
+
+    def handled(self, message_id: str) -> None:
+        """Remember `message_id` after handling it."""
+        self._seen[message_id] = None
+        self._seen.move_to_end(message_id)
+        if len(self._seen) > self.maxlen:
+            self._seen.popitem(last=False)
+
+
+async def list_subscriptions(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    limiter: Optional[RateLimiter] = None,
+) -> List[dict]:
+    """Fetch every EventSub subscription of the app, following pagination."""
+    subscriptions: List[dict] = []
+    cursor = None
+    while True:
+        params = [("after", cursor)] if cursor else []
+        response = await helix_get(client, "/eventsub/subscriptions", params, headers, limiter)
+        payload = codec.loads(response.content)
+        subscriptions.extend(payload.get("data", []))
+        cursor = payload.get("pagination", {}).get("cursor")
+        if not cursor:
+            return subscriptions
+
+
+async def create_subscription(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    subscription_type: str,
+    broadcaster_id: str,
+    callback_url: str,
+    secret: str,
+    limiter: Optional[RateLimiter] = None,
+) -> None:
+    """Subscribe to `subscription_type` events of a broadcaster."""
+    body = {
+        "type": subscription_type,
+        "version": "1",
+        "condition": {"broadcaster_user_id": broadcaster_id},
+        "transport": {"method": "webhook", "callback": callback_url, "secret": secret},
+    }
+    await helix_request(client, "POST", "/eventsub/subscriptions", headers, json=body, limiter=limiter)
+
+
+async def delete_subscription(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    subscription_id: str,
+    limiter: Optional[RateLimiter] = None,
+) -> None:
+    await helix_request(client, "DELETE", "/eventsub/subscriptions", headers, params=[("id", subscription_id)], limiter=limiter)
+
+
+async def remove_subscriptions(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    channel_names: List[str],
+    callback_url: str,
+    limiter: Optional[RateLimiter] = None,
+    id_cache: Optional[BroadcasterIdCache] = None,
+) -> int:
+    """
+    Delete the subscriptions of `channel_names` pointing at `callback_url`, e.g.
+    for channels removed from CHANNEL_LIST.
+
+    Returns:
+        int: The number of subscriptions deleted.
+    """
+    if id_cache:
+        broadcaster_ids = set((await id_cache.resolve(client, headers, channel_names, limiter)).values())
+    else:
+        broadcaster_ids = set((await fetch_user_ids(client, headers, channel_names, limiter)).values())
+
+    deleted = 0
+    for subscription in await list_subscriptions(client, headers, limiter):
+        if subscription.get("transport", {}).get("callback") != callback_url:
+            continue
+        if subscription.get("condition", {}).get("broadcaster_user_id") not in broadcaster_ids:
+            continue
+        try:
+            await delete_subscription(client, headers, subscription["id"], limiter)
+            deleted += 1
+        except httpx.HTTPStatusError as exc:
+            logger.error(
+                f"Failed to delete EventSub subscription {subscription['id']}: {exc.response.status_code}, {exc.response.text}"
+            )
+    logger.info(f"EventSub: {deleted} subscriptions of {len(channel_names)} removed channels deleted.")
+    return deleted
+
+
+async def sync_subscriptions(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    channel_names: List[str],
+    callback_url: str,
+    secret: str,
+    limiter: Optional[RateLimiter] = None,
+    id_cache: Optional[BroadcasterIdCache] = None,
+) -> int:
+    """
+    Make sure every channel has a stream.online and stream.offline subscription
+    pointing at `callback_url`.
+
+    Returns:
+        int: The number of subscriptions created.
+    """
+    if id_cache:
+        resolved = await id_cache.resolve(client, headers, channel_names, limiter)
+        user_ids = {login.lower(): user_id for login, user_id in resolved.items()}
+    else:
+        user_ids = await fetch_user_ids(client, headers, channel_names, limiter)
+    missing_logins = {name.lower() for name in channel_names} - user_ids.keys()
+    if missing_logins:
+        logger.warning(f"Could not resolve {len(missing_logins)} channels for EventSub: {', '.join(sorted(missing_logins))}")
+
+    existing: Set[Tuple[str, str]] = set()
+    for subscription in await list_subscriptions(client, headers, limiter):
+        if subscription.get("transport", {}).get("callback") != callback_url:
+            continue
+        if subscription.get("status") not in ("enabled", "webhook_callback_verification_pending"):
+            continue
+        existing.add((subscription["type"], subscription.get("condition", {}).get("broadcaster_user_id")))
+
+    created = 0
+    for login, broadcaster_id in user_ids.items():
+        for subscription_type in SUBSCRIPTION_TYPES:
+            if (subscription_type, broadcaster_id) in existing:
+                continue
+            try:
+                await create_subscription(client, headers, subscription_type, broadcaster_id, callback_url, secret, limiter)
+                created += 1
+            except httpx.HTTPStatusError as exc:
+                logger.error(
+                    f"Failed to subscribe to {subscription_type} for '{login}': {exc.response.status_code}, {exc.response.text}"
+                )
+    logger.info(f"EventSub: {created} subscriptions created, {len(existing)} already in place.")
+    return created
@@ -0,0 +1,361 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+
+from twitch import codec, metrics
+from twitch.auth import AuthHeaders
+from twitch.breaker import CLOSED, CircuitBreaker, CircuitOpenError
+from twitch.ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    from twitch.idcache import BroadcasterIdCache
+
+logger = logging.getLogger(__name__)
+
+HELIX_URL: str = os.getenv("HELIX_URL", "https://api.twitch.tv/helix")
+MAX_BATCH_SIZE: int = 100  # Helix accepts at most 100 user_login/user_id params per request
+HELIX_BREAKER_FAILURES: int = int(os.getenv("HELIX_BREAKER_FAILURES", 5))  # Failures in a row that open the circuit, 0 to disable
+HELIX_BREAKER_RESET: float = float(os.getenv("HELIX_BREAKER_RESET_SEC", 30))  # Seconds before an open circuit sends a probe
+
+# Shared by every Helix request of the process, so an outage seen by one caller stops all of them
+HELIX_BREAKER = CircuitBreaker("helix", failure_threshold=HELIX_BREAKER_FAILURES, reset_timeout=HELIX_BREAKER_RESET)
+
+# Failed requests of the innermost count_errors() block, inherited by the tasks started inside it
+_request_errors: ContextVar[Optional[Counter]] = ContextVar("helix_request_errors", default=None)
+
+
+@contextmanager
+def count_errors() -> Iterator[Counter]:
+    """
+    Count the Helix requests that fail for good inside the block, by error type,
+    including those of tasks it starts. Requests of other tasks, e.g. an EventSub
+    sync running at the same time, aren't counted.
+    """
+    errors: Counter = Counter()
+    token = _request_errors.set(errors)
+    try:
+        yield errors
+    finally:
+        _request_errors.reset(token)
+
+
+def record_error(error_type: str) -> None:
+    metrics.HELIX_ERRORS.inc(type=error_type)
+    errors = _request_errors.get()
+    if errors is not None:
+        errors[error_type] += 1
+
+
+def chunked(items: List[str], size: int = MAX_BATCH_SIZE) -> Iterator[List[str]]:
+    """Yield successive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def helix_request(
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    headers: Dict[str, str],
+    params: Optional[List[Tuple[str, str]]] = None,
+    json: Optional[dict] = None,
+    limiter: Optional[RateLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> httpx.Response:
+    """
+    Send a request to the Helix API.
+
+    Connection problems are retried up to 3 times with exponential backoff. When a
+    `limiter` is given every attempt waits for a token first, and a 429 response is
+    queued behind the limiter and retried instead of being treated as a failure.
+
+    With `headers` of a TokenManager, a 401 renews the token once (shared with
+    every other request that got one) and the request is retried with it.
+
+    Connection problems and 5xx responses count as failures of `breaker`
+    (HELIX_BREAKER by default). While it is open, CircuitOpenError is raised
+    instead of sending the request or retrying.
+    """
+    breaker = HELIX_BREAKER if breaker is None else breaker
+    attempt = 0
+    reauthenticated = False
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Helix circuit is open, next probe in {breaker.retry_in():.0f} seconds")
+        try:
+            if limiter:
+                await limiter.acquire()
+            started = time.perf_counter()
+            sent_token = headers.get("Authorization", "").removeprefix("Bearer ")
+            response = await client.request(method, f"{HELIX_URL}{path}", params=params, json=json, headers=headers)
+        except (httpx.ConnectError, httpx.ReadTimeout) as exc:
+            breaker.record_failure()
+            attempt += 1
+            logger.warning(f"Attempt {attempt}: Connection issue: {exc}")
+            if attempt < 3:  # If not the last attempt, wait and retry
+                metrics.HELIX_RETRIES.inc(reason=type(exc).__name__)
+                await asyncio.sleep(2 ** (attempt - 1))
+                continue
+            record_error(type(exc).__name__)
+            raise  # After 3 attempts, raise the exception
+        except httpx.RequestError as exc:
+            breaker.record_failure()
+            record_error(type(exc).__name__)
+            raise
+        except BaseException:
+            breaker.release()  # Cancelled, e.g. by the cycle deadline
+            raise
+        metrics.HELIX_LATENCY.observe(time.perf_counter() - started, path=path)
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        elif response.status_code == 429:
+            breaker.release()  # Twitch answered, so it isn't down, but this says nothing about recovery either
+        else:
+            breaker.record_success()
+
+        if response.status_code == 429:
+            metrics.HELIX_RATE_LIMITED.inc()
+        if limiter:
+            if response.status_code == 429:
+                limiter.on_rate_limited(response.headers)
+                metrics.HELIX_RETRIES.inc(reason="rate_limited")
+                continue
+            limiter.update(response.headers)
+        if response.status_code == 401 and isinstance(headers, AuthHeaders) and not reauthenticated:
+            reauthenticated = True
+            if await headers.manager.refresh(client, rejected=sent_token) != sent_token:
+                metrics.HELIX_RETRIES.inc(reason="unauthorized")
+                continue
+        if response.is_error:
+            record_error(f"http_{response.status_code}")
+        response.raise_for_status()
+        return response
+
+
+async def helix_get(
+    client: httpx.AsyncClient,
+    path: str,
+    params: List[Tuple[str, str]],
+    headers: Dict[str, str],
+    limiter: Optional[RateLimiter] = None,
+) -> httpx.Response:
+    """Send a GET request to the Helix API, see `helix_request()`."""
+    return await helix_request(client, "GET", path, headers, params=params, limiter=limiter)
+
+
+async def fetch_user_ids(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    logins: List[str],
+    limiter: Optional[RateLimiter] = None,
+) -> Dict[str, str]:
+    """Resolve logins to broadcaster IDs, 100 logins per request. Unknown logins are left out."""
+    user_ids: Dict[str, str] = {}
+    for batch in chunked(list(dict.fromkeys(login.lower() for login in logins))):
+        response = await helix_get(client, "/users", [("login", login) for login in batch], headers, limiter)
+        for user in codec.decode_users(response.content):
+            if user.get("login") and user.get("id"):
+                user_ids[user.get("login").lower()] = user.get("id")
+    return user_ids
+
+
+async def fetch_users(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    user_ids: Iterable[str],
+    limiter: Optional[RateLimiter] = None,
+) -> List[Any]:
+    """Fetch the users with the given IDs, 100 IDs per request. Unknown IDs are left out."""
+    users: List[Any] = []
+    for batch in chunked(list(dict.fromkeys(user_ids))):
+        response = await helix_get(client, "/users", [("id", user_id) for user_id in batch], headers, limiter)
+        users.extend(codec.decode_users(response.content))
+    return users
+
+
+async def fetch_games(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    game_ids: Iterable[str],
+    limiter: Optional[RateLimiter] = None,
+) -> List[Any]:
+    """Fetch the games (categories) with the given IDs, 100 IDs per request. Unknown IDs are left out."""
+    games: List[Any] = []
+    for batch in chunked(list(dict.fromkeys(game_ids))):
+        response = await helix_get(client, "/games", [("id", game_id) for game_id in batch], headers, limiter)
+        games.extend(codec.decode_games(response.content))
+    return games
+
+
+async def fetch_streams(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    logins: Iterable[str] = (),
+    user_ids: Iterable[str] = (),
+    limiter: Optional[RateLimiter] = None,
+) -> List[dict]:
+    """Fetch the live streams for up to 100 logins and/or user IDs in a single request."""
+    params = [("user_login", login) for login in logins] + [("user_id", user_id) for user_id in user_ids]
+    if len(params) > MAX_BATCH_SIZE:
+        raise ValueError(f"Helix /streams accepts at most {MAX_BATCH_SIZE} logins/IDs per request, got {len(params)}")
+    params.append(("first", str(MAX_BATCH_SIZE)))
+
+    response = await helix_get(client, "/streams", params, headers, limiter)
+    return codec.decode_streams(response.content)
+
+
+async def check_batch(
+    client: httpx.AsyncClient,
+    batch: List[str],
+    headers: Dict[str, str],
+    on_anomaly: Optional[Callable[[str, dict, str], None]] = None,
+    limiter: Optional[RateLimiter] = None,
+    user_ids: Optional[Dict[str, str]] = None,
+    id_cache: Optional["BroadcasterIdCache"] = None,
+    on_stream: Optional[Callable[[str, dict], None]] = None,
+) -> Dict[str, Optional[bool]]:
+    """
+    Look up the live status of a single batch of at most 100 channels.
+
+    Channels with a known broadcaster ID in `user_ids` are queried by ID, the
+    rest by login. Every live stream payload is handed to `on_stream`.
+    """
+    user_ids = user_ids or {}
+    by_id = {user_ids[name]: name for name in batch if name in user_ids}
+    by_login = {name.lower(): name for name in batch if name not in user_ids}
+    try:
+        streams = await fetch_streams(
+            client, headers, logins=by_login.keys(), user_ids=by_id.keys(), limiter=limiter
+        )
+    except CircuitOpenError:
+        streams = None  # Logged once per cycle by get_live_statuses()
+    except httpx.RequestError as exc:
+        logger.error(f"Request error for batch starting at '{batch[0]}': {exc}")
+        streams = None
+    except httpx.HTTPStatusError as exc:
+        logger.error(
+            f"HTTP status error for batch starting at '{batch[0]}': {exc.response.status_code}, {exc.response.text}"
+        )
+        streams = None
+    except Exception as exc:
+        logger.error(f"Unexpected error while checking the batch starting at '{batch[0]}': {exc}")
+        streams = None
+
+    # A failed lookup is unknown, not offline, so an outage doesn't read as every channel going offline
+    if streams is None:
+        return {name: None for name in batch}
+
+    statuses: Dict[str, Optional[bool]] = {name: False for name in batch}
+
+    for stream in streams:
+        name = by_id.get(stream.get("user_id")) or by_login.get(stream.get("user_login", "").lower())
+        if name is None:
+            continue
+        if id_cache:
+            id_cache.observe(name, stream)
+        if stream.get("type") == "live":
+            statuses[name] = True
+            if on_stream:
+                on_stream(name, stream)
+        else:
+            statuses[name] = None
+            if on_anomaly:
+                on_anomaly(name, stream, "null")
+    return statuses
+
+
+async def get_live_statuses(
+    client: httpx.AsyncClient,
+    channel_names: List[str],
+    client_id: str,
+    auth_key: str,
+    on_anomaly: Optional[Callable[[str, dict, str], None]] = None,
+    concurrency: int = 8,
+    deadline: Optional[float] = None,
+    limiter: Optional[RateLimiter] = None,
+    id_cache: Optional["BroadcasterIdCache"] = None,
+    on_stream: Optional[Callable[[str, dict], None]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Optional[bool]]:
+    """
+    Look up the live status of every channel in `channel_names`, 100 channels per request.
+
+    Helix /streams only returns channels that are currently live, so any requested
+    login missing from the response is offline. A stream whose `type` is not "live"
+    (Helix sends an empty string on errors) is reported as None and handed to
+    `on_anomaly` for troubleshooting.
+
+    Batches run concurrently, at most `concurrency` at a time. Batches still running
+    after `deadline` seconds are cancelled and their channels reported as None, so a
+    slow tail cannot delay the next cycle. Every request is paced by `limiter`.
+
+    With an `id_cache`, channels are looked up by their stable broadcaster ID, and
+    only channels whose ID can't be resolved fall back to a login lookup.
+
+    `on_stream(name, stream)` is called with the Helix payload of every live stream,
+    for callers that need more than the live flag (e.g. `started_at`).
+
+    `headers` replace the ones built from `client_id` and `auth_key`, e.g. the
+    `headers` of a TokenManager.
+
+    Channels whose batch failed are reported as None. While HELIX_BREAKER is open
+    the cycle is skipped and every channel reported as None; once it lets a probe
+    through, the first batch probes and the rest fail fast until the probe succeeds.
+
+    Returns:
+        dict: {channel_name: True/False/None} for every requested name.
+    """
+    headers = headers if headers is not None else {"Client-ID": client_id, "Authorization": f"Bearer {auth_key}"}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    channel_names = list(dict.fromkeys(channel_names))
+
+    if HELIX_BREAKER.retry_in() > 0:
+        logger.warning(
+            f"Helix circuit is open, skipping {len(channel_names)} channels for {HELIX_BREAKER.retry_in():.0f} more seconds."
+        )
+        return {name: None for name in channel_names}
+
+    user_ids: Dict[str, str] = {}
+    if id_cache and channel_names:
+        try:
+            user_ids = await id_cache.resolve(client, headers, channel_names, limiter)
+        except Exception as exc:
+            logger.error(f"Failed to resolve broadcaster IDs, looking up channels by login: {exc}")
+
+    async def bounded_check(batch: List[str]) -> Dict[str, Optional[bool]]:
+        async with semaphore:
+            return await check_batch(client, batch, headers, on_anomaly, limiter, user_ids, id_cache, on_stream)
+
+    batches = list(chunked(channel_names))
+    if not batches:
+        return {}
+
+    tasks = [asyncio.create_task(bounded_check(batch)) for batch in batches]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(
+            f"Cycle deadline of {deadline} seconds reached, {len(pending)} of {len(batches)} batches were not checked."
+        )
+
+    if HELIX_BREAKER.state != CLOSED:
+        logger.warning(f"Helix circuit is {HELIX_BREAKER.state}, the status of some channels is unknown this cycle.")
+
+    statuses: Dict[str, Optional[bool]] = {}
+    for batch, task in zip(batches, tasks):
+        if task in done:
+            statuses.update(task.result())
+        else:
+            statuses.update({name: None for name in batch})
+    return statuses
@@ -0,0 +1,135 @@
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from twitch import codec
+from twitch.helix import fetch_user_ids
+from twitch.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcasterIdCache:
+    """
+    Persistent login -> broadcaster_id map, so Helix can be queried by stable ID.
+
+    Unknown logins are resolved in bulk through /users (100 per request). Logins
+    that don't resolve (renamed, banned or deleted accounts) are retried lazily
+    after `missing_ttl` seconds instead of on every cycle. Renames seen in stream
+    payloads update the cache in place.
+    """
+
+    def __init__(self, path: str, missing_ttl: float = 3600.0):
+        self.path = path
+        self.missing_ttl = missing_ttl
+        self.ids: Dict[str, str] = {}
+        self.missing: Dict[str, float] = {}  # login -> monotonic time of the failed lookup
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    @staticmethod
+    def path_for(save_file: str) -> str:
+        """The cache file that lives alongside `save_file`."""
+        return f"{os.path.splitext(save_file)[0]}.ids.json"
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "rb") as json_file:
+                self.ids = {login.lower(): str(user_id) for login, user_id in codec.loads(json_file.read()).items()}
+            logger.info(f"Loaded {len(self.ids)} broadcaster IDs from {self.path}.")
+        except FileNotFoundError:
+            self.ids = {}
+        except (ValueError, AttributeError) as e:  # Every codec's decode error is a ValueError
+            logger.error(f"Ignoring unreadable broadcaster ID cache {self.path}: {e}")
+            self.ids = {}
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed, replacing the file atomically."""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb") as json_file:
+                json_file.write(codec.dumps(self.ids, pretty=codec.JSON_PRETTY))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            logger.error(f"Error saving broadcaster ID cache to {self.path}: {e}")
+
+    def get(self, login: str) -> Optional[str]:
+        user_id = self.ids.get(login.lower())
+        if user_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user_id
+
+    def set(self, login: str, user_id: str) -> None:
+        login = login.lower()
+        if self.ids.get(login) != user_id:
+            self.ids[login] = user_id
+            self.dirty = True
+        self.missing.pop(login, None)
+
+    def forget(self, login: str) -> None:
+        if self.ids.pop(login.lower(), None) is not None:
+            self.dirty = True
+
+    def observe(self, name: str, stream: dict) -> None:
+        """Record the ID/login pair of a stream payload, catching renames."""
+        user_id, user_login = stream.get("user_id"), stream.get("user_login", "")
+        if not user_id or not user_login:
+            return
+        if user_login.lower() != name.lower() and self.ids.get(user_login.lower()) != user_id:
+            logger.warning(f"Channel '{name}' has been renamed to '{user_login}'.")
+            self.set(user_login, user_id)
+        self.set(name, user_id)
+
+    async def resolve(
+        self,
+        client: httpx.AsyncClient,
+        headers: Dict[str, str],
+        logins: List[str],
+        limiter: Optional[RateLimiter] = None,
+    ) -> Dict[str, str]:
+        """
+        Map every login in `logins` to its broadcaster ID, fetching misses in bulk.
+
+        Returns:
+            dict: {login: broadcaster_id} (login as given) for every login that resolved.
+        """
+        now = time.monotonic()
+        resolved: Dict[str, str] = {}
+        to_fetch: List[str] = []
+        for login in logins:
+            user_id = self.get(login)
+            if user_id is not None:
+                resolved[login] = user_id
+            elif now - self.missing.get(login.lower(), -self.missing_ttl) >= self.missing_ttl:
+                to_fetch.append(login)
+
+        if to_fetch:
+            fetched = await fetch_user_ids(client, headers, to_fetch, limiter)
+            for login in to_fetch:
+                user_id = fetched.get(login.lower())
+                if user_id is None:
+                    self.missing[login.lower()] = now
+                    continue
+                self.set(login, user_id)
+                resolved[login] = user_id
+            logger.info(f"Resolved {len(fetched)} of {len(to_fetch)} new broadcaster IDs.")
+        return resolved
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "miss_rate": self.misses / lookups if lookups else 0.0,
+        }
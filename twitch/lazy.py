@@ -0,0 +1,33 @@
+import sys
+import importlib.util
+from types import ModuleType
+from typing import Optional
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return module `name` without executing it yet.
+
+    The module is loaded on first attribute access, so entry points only pay for
+    the imports of the code paths they actually run. Raises ModuleNotFoundError
+    right away if the module isn't installed.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    """`lazy_import()` for optional dependencies: None if `name` isn't installed."""
+    try:
+        return lazy_import(name)
+    except ModuleNotFoundError:
+        return None
@@ -0,0 +1,90 @@
+import os
+import time
+import queue
+import atexit
+import logging
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+LOG_FILE: str = os.getenv("LOG_FILE", "twitch_bot.log")
+LOG_MAX_BYTES: int = int(float(os.getenv("LOG_MAX_MB", 10)) * 1024 * 1024)  # Rotate the log file at this size
+LOG_BACKUPS: int = int(os.getenv("LOG_BACKUPS", 5))  # Rotated log files to keep
+LOG_MODE: str = os.getenv("LOG_MODE", "channel").strip().lower()  # "channel": a line per channel check, "summary": a line per cycle
+LOG_FORMAT: str = "%(asctime)s [%(levelname)s] - %(message)s"
+
+# Level of the per-channel and per-tick detail lines, which summary mode hides
+DETAIL_LOG_LEVEL: int = logging.DEBUG if LOG_MODE == "summary" else logging.INFO
+
+MAX_SUMMARY_NAMES = 10  # Channel names listed per transition in a summary line
+
+
+def setup_logging(handlers: List[logging.Handler], level: int = logging.INFO) -> QueueListener:
+    """
+    Route the root logger through a queue to `handlers` plus a rotating LOG_FILE.
+
+    Log calls only put the record on the queue; a QueueListener thread does the
+    formatting and the console and file I/O, so logging never blocks the event loop.
+    The listener is stopped, flushing what is queued, at exit.
+    """
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    if LOG_MODE == "summary":
+        logging.getLogger("httpx").setLevel(logging.WARNING)  # A line per request is more chatter than per channel
+    return listener
+
+
+class CycleSummary:
+    """Collects what happened in one poll cycle for a single structured log line."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts: Counter = Counter()
+        self.transitions: Dict[str, List[str]] = {"went_live": [], "went_offline": []}
+        self.errors = 0  # Failed Helix requests of this cycle, see twitch.helix.count_errors()
+
+    def checked(self, live: Optional[bool]) -> None:
+        self.counts["unknown" if live is None else "live" if live else "offline"] += 1
+
+    def transition(self, channel_name: str, live: bool) -> None:
+        self.transitions["went_live" if live else "went_offline"].append(channel_name)
+
+    def _counts(self) -> Dict[str, int]:
+        return {
+            "checked": sum(self.counts.values()),
+            "live": self.counts["live"],
+            "offline": self.counts["offline"],
+            "unknown": self.counts["unknown"],
+            "went_live": len(self.transitions["went_live"]),
+            "went_offline": len(self.transitions["went_offline"]),
+            "errors": self.errors,
+        }
+
+    def data(self, **extra) -> dict:
+        """The summary as a dict, with every channel that changed, e.g. for the event stream."""
+        fields = self._counts()
+        fields["duration"] = round(time.monotonic() - self.started, 3)
+        fields.update(extra)
+        fields.update({f"{key}_channels": list(names) for key, names in self.transitions.items()})
+        return fields
+
+    def line(self, **extra) -> str:
+        """The summary in logfmt, e.g. `cycle checked=300 live=12 ... duration=0.84s`."""
+        fields = self._counts()
+        fields["duration"] = f"{time.monotonic() - self.started:.2f}s"
+        fields.update(extra)
+        for key, names in self.transitions.items():
+            if names:
+                listed = ",".join(names[:MAX_SUMMARY_NAMES]) + (",..." if len(names) > MAX_SUMMARY_NAMES else "")
+                fields[f"{key}_channels"] = listed
+        return "cycle " + " ".join(f"{key}={value}" for key, value in fields.items())
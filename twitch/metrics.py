@@ -0,0 +1,249 @@
+import math
+import time
+import asyncio
+import bisect
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Registry:
+    """A set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+
+    def register(self, metric: "Metric") -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric(ABC):
+    """Base of the metric types: a name, help text and label names, registered on creation."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """The metric's lines in the Prometheus text format, without HELP and TYPE."""
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        """The sum over every label combination."""
+        return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        if not self.labelnames and not self._values:
+            return [f"{self.name} 0.0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down. Unlabelled gauges can read their value from
+    a callback at render time, so they always show the owner object's current state.
+    """
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.warning(f"Could not read gauge {self.name}: {e}")
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    """Counts observations into cumulative `le` buckets, plus their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.setdefault(key, [0] * len(self.buckets))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the `with` block took, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines: List[str] = []
+        names = self.labelnames + ("le",)
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def observe_detection_lag(started_at: Optional[datetime]) -> None:
+    """Record how long after the stream started at `started_at` its live alert went out."""
+    if started_at is not None:
+        DETECTION_LAG.observe(max(0.0, (datetime.now(timezone.utc) - started_at).total_seconds()))
+
+
+async def start_http_server(port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """Serve `GET /metrics` on `port` for processes without a web framework, such as bot.py."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():  # Skip the request headers
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+# Poll loop
+CYCLE_DURATION = Histogram(
+    "twitch_poll_cycle_duration_seconds",
+    "Time to check and apply the channels due in one poll cycle.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+CHANNELS_CHECKED = Counter("twitch_poll_channels_checked_total", "Channel status checks, by result.", ["result"])
+POLL_OVERDUE = Gauge("twitch_poll_overdue_seconds", "How far past its due time the most overdue channel is.")
+
+# Helix
+HELIX_LATENCY = Histogram("twitch_helix_request_duration_seconds", "Latency of Helix API requests.", ["path"])
+HELIX_RETRIES = Counter("twitch_helix_retries_total", "Helix requests retried, by reason.", ["reason"])
+HELIX_ERRORS = Counter("twitch_helix_errors_total", "Helix requests that failed for good, by error type.", ["type"])
+HELIX_RATE_LIMITED = Counter("twitch_helix_rate_limited_total", "Helix 429 Too Many Requests responses.")
+HELIX_BUDGET_REMAINING = Gauge("twitch_helix_ratelimit_remaining", "Helix requests left in the current rate limit window.")
+CIRCUIT_STATE = Gauge("circuit_breaker_state", "State of a circuit breaker: 0 closed, 1 half-open, 2 open.", ["name"])
+CIRCUIT_OPENED = Counter("circuit_breaker_opened_total", "Times a circuit breaker opened.", ["name"])
+CIRCUIT_REJECTED = Counter("circuit_breaker_rejected_total", "Calls refused while a circuit breaker was open.", ["name"])
+
+# Discord
+WEBHOOK_LATENCY = Histogram("discord_webhook_request_duration_seconds", "Latency of Discord webhook requests.")
+WEBHOOK_MESSAGES = Counter("discord_webhook_messages_total", "Discord messages by outcome.", ["result"])
+WEBHOOK_QUEUE_DEPTH = Gauge("discord_webhook_queue_depth", "Discord messages waiting to be sent.")
+
+ENRICH_CACHE = Counter("alert_enrichment_cache_total", "Alert enrichment cache lookups, by cache and result.", ["cache", "result"])
+
+# Event stream
+EVENTS_PUBLISHED = Counter("event_stream_events_total", "Events published to the event stream, by type.", ["type"])
+EVENT_SUBSCRIBERS = Gauge("event_stream_subscribers", "Clients connected to the event stream.")
+EVENT_CLIENTS_DROPPED = Counter("event_stream_clients_dropped_total", "Event stream clients disconnected for falling behind.")
+
+DETECTION_LAG = Histogram(
+    "twitch_detection_lag_seconds",
+    "Time from a stream starting to its live alert being queued.",
+    buckets=(5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+
+DUMP_RECORDS = Counter("troubleshooting_dump_records_total", "Troubleshooting records by outcome.", ["result"])
@@ -0,0 +1,147 @@
+import time
+import random
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+import httpx
+
+from twitch import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt."""
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+
+class WebhookQueue:
+    """
+    Bounded outbound queue for a Discord webhook, drained by a background worker.
+
+    `enqueue()` never blocks: when the queue is full the message is dropped and
+    counted. The worker honours Discord's X-RateLimit-* bucket headers and the
+    `retry_after` of 429 responses, and retries transport and 5xx errors with
+    backoff up to `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        webhook_url: str,
+        maxsize: int = 1000,
+        max_attempts: int = 5,
+        log_level: int = logging.INFO,
+    ):
+        self.client = client
+        self.webhook_url = webhook_url
+        self.max_attempts = max_attempts
+        self.log_level = log_level
+        self.queue: asyncio.Queue[Tuple[dict, str]] = asyncio.Queue(maxsize=maxsize)
+        self.blocked_until = 0.0  # Monotonic time before which the bucket is exhausted
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background delivery worker."""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued messages up to `timeout` seconds to go out, then stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Discord queue did not drain in time, stopping with {self.queue.qsize()} messages still queued.")
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def enqueue(self, payload: dict, description: str = "message") -> bool:
+        """Queue a webhook payload for delivery. Returns False if it was dropped."""
+        try:
+            self.queue.put_nowait((payload, description))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            metrics.WEBHOOK_MESSAGES.inc(result="dropped")
+            logger.warning(f"Discord queue is full, dropped {description}.")
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            payload, description = await self.queue.get()
+            try:
+                await self._deliver(payload, description)
+            except Exception as e:
+                self.failed += 1
+                metrics.WEBHOOK_MESSAGES.inc(result="failed")
+                logger.error(f"Unexpected error while sending {description} to Discord: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _wait_for_bucket(self) -> None:
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _update_bucket(self, response: httpx.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_after = response.headers.get("X-RateLimit-Reset-After")
+        if remaining == "0" and reset_after:
+            try:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + float(reset_after))
+            except ValueError:
+                pass
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            return float(response.json().get("retry_after"))
+        except Exception:
+            pass
+        try:
+            return float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0
+
+    async def _deliver(self, payload: dict, description: str) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_bucket()
+            started = time.perf_counter()
+            try:
+                response = await self.client.post(self.webhook_url, json=payload)
+            except httpx.RequestError as exc:
+                logger.warning(f"Attempt {attempt}: Connection issue while sending {description} to Discord: {exc}")
+                await asyncio.sleep(backoff(attempt))
+                continue
+
+            metrics.WEBHOOK_LATENCY.observe(time.perf_counter() - started)
+            self._update_bucket(response)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                logger.warning(f"Attempt {attempt}: Discord rate limited {description}, retrying in {retry_after} seconds.")
+                continue
+            if response.status_code >= 500:
+                logger.warning(f"Attempt {attempt}: Discord returned {response.status_code} for {description}.")
+                await asyncio.sleep(backoff(attempt))
+                continue
+            if response.status_code >= 400:
+                self.failed += 1
+                metrics.WEBHOOK_MESSAGES.inc(result="failed")
+                logger.error(f"Discord rejected {description}: {response.status_code}, {response.text}")
+                return
+
+            self.sent += 1
+            metrics.WEBHOOK_MESSAGES.inc(result="sent")
+            logger.log(self.log_level, f"Sent {description} to Discord.")
+            return
+
+        self.failed += 1
+        metrics.WEBHOOK_MESSAGES.inc(result="failed")
+        logger.error(f"Giving up on {description} after {self.max_attempts} attempts.")
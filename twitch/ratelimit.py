@@ -0,0 +1,106 @@
+import time
+import asyncio
+import logging
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    """Read a numeric header, returning None if it is missing or malformed."""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every Helix request.
+
+    The bucket refills continuously at `limit` tokens per `window` seconds, which is
+    how Twitch refills its own bucket. Every response corrects the local estimate
+    from the `Ratelimit-Limit`, `Ratelimit-Remaining` and `Ratelimit-Reset` headers,
+    and a 429 blocks all callers until the reset time. Callers that can't get a
+    token wait in FIFO order instead of being dropped.
+    """
+
+    def __init__(self, limit: int = 800, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.reset_at = 0.0  # Epoch seconds at which Twitch says the bucket is full again
+        self.blocked_until = 0.0  # Monotonic time before which no request may be sent
+        self.queued = 0
+        self.throttled = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Tokens regained per second."""
+        return self.limit / self.window
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(float(self.limit), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent and take a token for it."""
+        self.queued += 1
+        try:
+            async with self._lock:  # asyncio.Lock wakes waiters in FIFO order
+                while True:
+                    now = time.monotonic()
+                    if now < self.blocked_until:
+                        await asyncio.sleep(self.blocked_until - now)
+                        continue
+
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.queued -= 1
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Correct the bucket from the Ratelimit-* headers of a Helix response."""
+        limit = _header_number(headers, "Ratelimit-Limit")
+        remaining = _header_number(headers, "Ratelimit-Remaining")
+        reset = _header_number(headers, "Ratelimit-Reset")
+
+        self._refill()
+        if limit:
+            self.limit = int(limit)
+        if remaining is not None:
+            # Twitch is authoritative, but requests still in flight have already
+            # taken local tokens, so only ever lower the local estimate.
+            self.tokens = min(self.tokens, remaining)
+        if reset:
+            self.reset_at = reset
+
+    def on_rate_limited(self, headers: Mapping[str, str]) -> None:
+        """Handle a 429: empty the bucket and hold every caller until the reset time."""
+        self.update(headers)
+        self.throttled += 1
+        self.tokens = 0.0
+
+        wait = max(self.reset_at - time.time(), 1 / self.rate)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        logger.warning(f"Helix rate limit hit, holding requests for {wait:.1f} seconds.")
+
+    def budget(self) -> dict:
+        """Current state of the bucket, for monitoring."""
+        self._refill()
+        return {
+            "limit": self.limit,
+            "remaining": int(self.tokens),
+            "reset": self.reset_at,
+            "queued": self.queued,
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,157 @@
+import re
+import bisect
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from twitch.channel import Channel
+
+ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')  # One tag of an If-None-Match list, weak or strong
+
+
+class ChannelRegistry:
+    """
+    Insertion-ordered collection of channels with an O(1) name index.
+
+    Lookups are exact by name; `find()` also matches logins case-insensitively
+    (Twitch logins are lowercase, but channel lists may not be).
+
+    `version` goes up whenever a channel is added or removed, or `touch()` is
+    called after a live state changed, so readers can tell cheaply whether
+    anything is different since they last looked.
+
+    The registry also remembers the channel list it was last synced with, so
+    an edit of CHANNEL_LIST only removes the names deleted from it, never the
+    channels added some other way.
+    """
+
+    def __init__(self, channels: Iterable[Channel] = ()):
+        self._channels: Dict[str, Channel] = {}
+        self._by_login: Dict[str, str] = {}  # Only for names that aren't already lowercase
+        self._sorted: Optional[List[Tuple[str, str]]] = None  # (login, name) pairs, rebuilt lazily for page()
+        self._instance = uuid.uuid4().hex[:8]  # Tells versions of different registries apart
+        self._listed: Dict[str, None] = {}  # Names on the channel list as of the last sync()
+        self.version = 0
+        for channel in channels:
+            self.add(channel)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __iter__(self) -> Iterator[Channel]:
+        return iter(self._channels.values())
+
+    def __contains__(self, name: Union[str, Channel]) -> bool:
+        if isinstance(name, Channel):
+            name = name.name
+        return name in self._channels
+
+    def get(self, name: str) -> Optional[Channel]:
+        return self._channels.get(name)
+
+    def find(self, login: str) -> Optional[Channel]:
+        """Look up a channel by its Twitch login, ignoring case."""
+        login = login.lower()
+        return self._channels.get(self._by_login.get(login, login))
+
+    def add(self, channel: Channel) -> bool:
+        """Add `channel`. Returns False if a channel with that name is already registered."""
+        if not channel or not channel.name or channel.name in self._channels:
+            return False
+        self._channels[channel.name] = channel
+        if channel.name != channel.name.lower():
+            self._by_login[channel.name.lower()] = channel.name
+        self._sorted = None
+        self.version += 1
+        return True
+
+    def add_name(self, name: str, live: bool = False) -> Optional[Channel]:
+        """Add a channel by name. Returns the new channel, or None if it was already registered."""
+        channel = Channel(name, live)
+        return channel if self.add(channel) else None
+
+    def remove(self, name: str) -> Optional[Channel]:
+        """Remove a channel by name, returning it if it was registered."""
+        channel = self._channels.pop(name, None)
+        if channel is not None:
+            if self._by_login.get(name.lower()) == name:
+                del self._by_login[name.lower()]
+            self._sorted = None
+            self.version += 1
+        return channel
+
+    def mark_listed(self, names: Iterable[str]) -> None:
+        """Record `names` as the current channel list, the one the next `sync()` is compared against."""
+        self._listed = dict.fromkeys(name for name in names if name)
+
+    def sync(self, names: Iterable[str]) -> Tuple[List[Channel], List[Channel]]:
+        """
+        Apply a new version of the channel list: add the names that aren't
+        registered, and remove the channels that were on the previous version but
+        no longer are. Channels that never were on the list, like those added with
+        add-channel.py, stay. So does the state of every channel that stays.
+
+        Returns:
+            tuple: (added, removed) channels.
+        """
+        wanted = dict.fromkeys(name for name in names if name)
+        removed = [channel for channel in (self.remove(name) for name in self._listed if name not in wanted) if channel is not None]
+        added = [channel for channel in (self.add_name(name) for name in wanted) if channel is not None]
+        self._listed = wanted
+        return added, removed
+
+    def touch(self) -> None:
+        """Record that the live state of a channel changed."""
+        self.version += 1
+
+    @property
+    def etag(self) -> str:
+        """An HTTP entity tag that changes whenever `version` does."""
+        return f'"{self._instance}-{self.version}"'
+
+    def page(
+        self, prefix: str = "", live: Optional[bool] = None, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Channel], Optional[str]]:
+        """
+        One page of channels ordered by login, optionally only those whose login
+        starts with `prefix` (ignoring case) or with the given live state.
+
+        Returns:
+            tuple: (channels, cursor), where cursor is the `after` value for the
+            next page, or None on the last page.
+        """
+        if self._sorted is None:
+            self._sorted = sorted((name.lower(), name) for name in self._channels)
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._sorted, (prefix, ""))
+        if after is not None:
+            start = max(start, bisect.bisect_right(self._sorted, (after.lower(), after)))
+
+        channels: List[Channel] = []
+        for login, name in self._sorted[start:]:
+            if not login.startswith(prefix):
+                break
+            channel = self._channels[name]
+            if live is not None and bool(channel.live) != live:
+                continue
+            if len(channels) == limit:
+                return channels, channels[-1].name
+            channels.append(channel)
+        return channels, None
+
+    def names(self) -> List[str]:
+        return list(self._channels)
+
+    def live_count(self) -> int:
+        return sum(1 for channel in self._channels.values() if channel.live)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches `etag`: `*`, or any tag of its
+    comma-separated list, compared weakly (a `W/` prefix is ignored).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in ENTITY_TAG.findall(if_none_match)
@@ -0,0 +1,164 @@
+import os
+import sys
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from twitch import codec
+from twitch.core import get_channels, send_webhook
+from twitch.notify import WebhookQueue
+
+logger = logging.getLogger(__name__)
+
+ALL_CHANNELS = "*"
+
+
+class Route:
+    """A Discord webhook, the role it mentions and the channels it is alerted about (None for all)."""
+
+    __slots__ = ("name", "webhook_url", "role_id", "channels")
+
+    def __init__(self, name: str, webhook_url: str, role_id: Optional[str] = None, channels: Optional[Iterable[str]] = None):
+        self.name = name
+        self.webhook_url = webhook_url
+        self.role_id = role_id
+        self.channels = None if channels is None else frozenset(channel.lower() for channel in channels)
+
+    def __repr__(self) -> str:
+        covered = "all channels" if self.channels is None else f"{len(self.channels)} channels"
+        return f"Route({self.name!r}, {covered})"
+
+
+def load_routes(path: str) -> List[Route]:
+    """
+    Read the routes of ROUTES_FILE, a JSON file like:
+
+        {"routes": [
+            {"name": "community-a", "webhook_url": "https://discord.com/api/webhooks/...", "role_id": "123",
+             "channels": ["foo", "bar"]},
+            {"name": "community-b", "webhook_url": "https://discord.com/api/webhooks/...",
+             "channels_file": "community-b.txt"},
+            {"name": "everything", "webhook_url": "https://discord.com/api/webhooks/...", "channels": "*"}
+        ]}
+
+    `channels_file` is a channel list like CHANNEL_LIST, relative to ROUTES_FILE.
+    Raises ValueError if a route is incomplete.
+    """
+    with open(path, "rb") as f:
+        data = codec.loads(f.read())
+
+    routes = []
+    for index, entry in enumerate(data.get("routes", [])):
+        name = entry.get("name") or f"route-{index}"
+        if not entry.get("webhook_url"):
+            raise ValueError(f"Route {name} in {path} has no webhook_url")
+        if "channels_file" in entry:
+            channels = get_channels(os.path.join(os.path.dirname(path), entry["channels_file"]))
+        else:
+            channels = entry.get("channels", ALL_CHANNELS)
+        routes.append(Route(name, entry["webhook_url"], entry.get("role_id"), None if channels == ALL_CHANNELS else channels))
+    if not routes:
+        raise ValueError(f"No routes in {path}")
+    return routes
+
+
+class Router:
+    """
+    Fans the transitions of a channel out to every route subscribed to it.
+
+    A channel -> routes index keeps the lookup per transition independent of the
+    number of routes. Every distinct webhook URL gets a WebhookQueue of its own,
+    so each webhook is throttled by its own Discord rate-limit bucket and a slow
+    or failing webhook doesn't hold up the others.
+    """
+
+    def __init__(self, routes: List[Route]):
+        self.routes = routes
+        self.all_channel_routes: List[Route] = [route for route in routes if route.channels is None]
+        self.index: Dict[str, List[Route]] = {}
+        for route in routes:
+            for channel in route.channels or ():
+                self.index.setdefault(channel, []).append(route)
+        self.queues: Dict[str, WebhookQueue] = {}
+
+    def routes_for(self, channel_name: str) -> List[Route]:
+        """The routes subscribed to `channel_name` (case-insensitive)."""
+        return self.all_channel_routes + self.index.get(channel_name.lower(), [])
+
+    def log_coverage(self, channel_names: Iterable[str], all_monitored: bool = True) -> None:
+        """
+        Warn about monitored channels no route gets alerts for and, if `channel_names`
+        are all the monitored channels (not a shard of them), routed channels that aren't monitored.
+        """
+        monitored = {name.lower() for name in channel_names}
+        if not self.all_channel_routes:
+            unrouted = sorted(monitored - self.index.keys())
+            if unrouted:
+                logger.warning(f"{len(unrouted)} channels are in no route and won't be alerted about: {', '.join(unrouted[:10])}.")
+        unmonitored = sorted(self.index.keys() - monitored)
+        if unmonitored and all_monitored:
+            logger.warning(f"{len(unmonitored)} routed channels are not monitored, add them to CHANNEL_LIST: {', '.join(unmonitored[:10])}.")
+
+    def start(self, client: httpx.AsyncClient, **queue_options) -> None:
+        """Start a delivery queue per webhook URL; `queue_options` go to every WebhookQueue."""
+        for route in self.routes:
+            if route.webhook_url not in self.queues:
+                self.queues[route.webhook_url] = WebhookQueue(client, route.webhook_url, **queue_options)
+                self.queues[route.webhook_url].start()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        for queue in self.queues.values():
+            await queue.stop(timeout)
+
+    def queue_depth(self) -> int:
+        return sum(queue.queue.qsize() for queue in self.queues.values())
+
+    def notify(self, channel_name: str, status: str, details: Optional[dict] = None) -> Tuple[int, int]:
+        """
+        Queue the alert for `channel_name` on every subscribed route, as an embed if
+        there are `details`. Returns immediately.
+
+        Returns:
+            tuple: (queued, dropped) number of routes.
+        """
+        queued = dropped = 0
+        for route in self.routes_for(channel_name):
+            # With several routes, say which one a log line is about
+            route_name = route.name if len(self.routes) > 1 else None
+            if send_webhook(self.queues[route.webhook_url], route.role_id, channel_name, status, route_name, details):
+                queued += 1
+            else:
+                dropped += 1
+        return queued, dropped
+
+    def stats(self) -> List[dict]:
+        """Delivery counters per route. Routes sharing a webhook share its counters."""
+        stats = []
+        for route in self.routes:
+            queue = self.queues.get(route.webhook_url)
+            stats.append({
+                "name": route.name,
+                "channels": "all" if route.channels is None else len(route.channels),
+                "queued": queue.queue.qsize() if queue else 0,
+                "sent": queue.sent if queue else 0,
+                "failed": queue.failed if queue else 0,
+                "dropped": queue.dropped if queue else 0,
+            })
+        return stats
+
+
+def create_router(routes_file: Optional[str], webhook_url: Optional[str], role_id: Optional[str]) -> Router:
+    """
+    The routes of `routes_file`, or a single route for every channel from
+    DISCORD_WEBHOOK_URL and TWITCH_ROLE_ID. Exits if `routes_file` can't be used.
+    """
+    if not routes_file:
+        return Router([Route("default", webhook_url, role_id)])
+    try:
+        routes = load_routes(routes_file)
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f"Could not load the routes in {routes_file}: {e}")
+        sys.exit(1)
+    logger.info(f"Loaded {len(routes)} routes from {routes_file}: {', '.join(route.name for route in routes)}.")
+    return Router(routes)
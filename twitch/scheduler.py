@@ -0,0 +1,184 @@
+import time
+import heapq
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class PollScheduler:
+    """
+    Decides which channels are due for a status check.
+
+    Every channel has a next-due time kept in a min-heap. Channels that are live,
+    or inside the window around a time of day they usually go live at, are polled
+    every `fast_interval` seconds. Offline channels start at `base_interval` and
+    back off by `backoff` after every offline check, up to `max_interval`.
+
+    `pop_due()` never hands out more channels than `requests_per_minute` requests
+    of `batch_size` channels can cover, so the global request rate stays within
+    budget no matter how many channels are due; the rest wait for the next tick in
+    due order.
+
+    Start times are the streams' own `started_at` when the caller has it, so a
+    slow check doesn't shift the learned windows. `on_start(name, started_at)`
+    is called with every new one, e.g. to keep them across restarts.
+    """
+
+    def __init__(
+        self,
+        base_interval: float,
+        fast_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        backoff: float = 1.5,
+        requests_per_minute: float = 600,
+        batch_size: int = 100,
+        start_window: float = 30 * 60,
+        history: int = 10,
+        on_start: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval if fast_interval is not None else base_interval
+        self.max_interval = max_interval if max_interval is not None else base_interval
+        self.backoff = backoff
+        self.requests_per_minute = requests_per_minute
+        self.batch_size = batch_size
+        self.start_window = start_window
+        self.history = history
+        self.on_start = on_start
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}  # Current due time per channel, stale heap entries are skipped
+        self._interval: Dict[str, float] = {}
+        self._live: Dict[str, bool] = {}
+        self._starts: Dict[str, Deque[float]] = {}  # Recent go-live times as seconds since midnight UTC
+        self._seq = 0
+        self._last_pop: Optional[float] = None
+        self._allowance = float(requests_per_minute)  # Requests that may still be spent, refilled per minute
+
+    def __len__(self) -> int:
+        return len(self._interval)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._interval
+
+    def _push(self, name: str, due: float) -> None:
+        self._seq += 1
+        self._due[name] = due
+        heapq.heappush(self._heap, (due, self._seq, name))
+
+    def add(self, name: str, live: bool = False, due: Optional[float] = None) -> None:
+        """Start scheduling `name`, due immediately unless `due` is given."""
+        self._interval.setdefault(name, self.base_interval)
+        self._live[name] = live
+        self._push(name, time.time() if due is None else due)
+
+    def remove(self, name: str) -> None:
+        """Stop scheduling `name`. Its heap entry is dropped lazily."""
+        for state in (self._due, self._interval, self._live, self._starts):
+            state.pop(name, None)
+
+    def record_start(self, name: str, started_at: Optional[float] = None) -> None:
+        """Remember that `name` went live at `started_at` (epoch seconds)."""
+        starts = self._starts.setdefault(name, deque(maxlen=self.history))
+        starts.append((started_at if started_at is not None else time.time()) % DAY_SECONDS)
+
+    def _seconds_to_window(self, name: str, now: float) -> Optional[float]:
+        """Seconds until the next usual-start window of `name` opens, 0 if inside one."""
+        starts = self._starts.get(name)
+        if not starts:
+            return None
+        time_of_day = now % DAY_SECONDS
+        best = None
+        for start in starts:
+            delta = (start - self.start_window - time_of_day) % DAY_SECONDS
+            if delta > DAY_SECONDS - 2 * self.start_window:  # Already inside the window
+                return 0.0
+            best = delta if best is None else min(best, delta)
+        return best
+
+    def record(self, name: str, live: Optional[bool], now: Optional[float] = None, started_at: Optional[float] = None) -> float:
+        """
+        Reschedule `name` after a check. `live` is None when the status is unknown.
+        `started_at` is when the stream started (epoch seconds), if known; otherwise
+        a channel that went live is taken to have started `now`.
+
+        Returns:
+            float: The epoch time `name` is due next.
+        """
+        if name not in self._interval:
+            return float("inf")  # Removed while it was being checked
+        now = time.time() if now is None else now
+
+        if live is None:
+            interval = self.base_interval
+        elif live:
+            if not self._live.get(name):
+                started_at = now if started_at is None else started_at
+                self.record_start(name, started_at)
+                if self.on_start:
+                    self.on_start(name, started_at)
+            interval = self.fast_interval
+            self._interval[name] = self.base_interval
+        else:
+            interval = self._interval.get(name, self.base_interval)
+            if self._live.get(name):
+                interval = self.base_interval  # Just went offline, start backing off again
+            self._interval[name] = min(self.max_interval, interval * self.backoff)
+
+        if live is not None:
+            self._live[name] = live
+
+        window = self._seconds_to_window(name, now)
+        if window is not None and not live:
+            interval = self.fast_interval if window == 0 else min(interval, window)
+
+        due = now + interval
+        self._push(name, due)
+        return due
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        Pop the channels that are due, as many as the request budget allows since
+        the last call. Every popped channel must be handed back through `record()`.
+        """
+        now = time.time() if now is None else now
+        if self._last_pop is not None:
+            elapsed = max(0.0, now - self._last_pop)
+            self._allowance = min(self.requests_per_minute, self._allowance + self.requests_per_minute * elapsed / 60)
+        self._last_pop = now
+        limit = int(self._allowance) * self.batch_size
+
+        due: List[str] = []
+        while self._heap and len(due) < limit:
+            when, _, name = self._heap[0]
+            if self._due.get(name) != when:
+                heapq.heappop(self._heap)  # Stale entry for a rescheduled or removed channel
+                continue
+            if when > now:
+                break
+            heapq.heappop(self._heap)
+            del self._due[name]
+            due.append(name)
+        self._allowance -= -(-len(due) // self.batch_size)  # Requests needed for the popped channels
+        return due
+
+    def overdue(self, now: Optional[float] = None) -> float:
+        """Seconds the earliest channel is past its due time, 0 if none is late."""
+        now = time.time() if now is None else now
+        until = self.seconds_until_next(now)
+        if until is None or until > 0:
+            return 0.0
+        return max(0.0, now - self._heap[0][0])
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the earliest channel is due, or None if nothing is scheduled."""
+        now = time.time() if now is None else now
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
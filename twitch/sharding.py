@@ -0,0 +1,89 @@
+import os
+import json
+import bisect
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping channel names to workers.
+
+    Every worker is placed on the ring `replicas` times, so channels spread evenly
+    and adding or removing one of N workers only moves about 1/N of the channels.
+    """
+
+    def __init__(self, workers: Iterable[str], replicas: int = 128):
+        self.workers = sorted(set(workers))
+        if not self.workers:
+            raise ValueError("A hash ring needs at least one worker")
+        self.replicas = replicas
+        points = sorted((_hash(f"{worker}#{replica}"), worker) for worker in self.workers for replica in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._owners = [worker for _, worker in points]
+
+    def worker_for(self, channel_name: str) -> str:
+        """The worker that owns `channel_name` (case-insensitive)."""
+        index = bisect.bisect(self._keys, _hash(channel_name.lower())) % len(self._keys)
+        return self._owners[index]
+
+    def owned_by(self, worker: str, channel_names: Iterable[str]) -> List[str]:
+        """The subset of `channel_names` owned by `worker`, in the given order."""
+        return [name for name in channel_names if self.worker_for(name) == worker]
+
+
+def parse_workers(value: str) -> List[str]:
+    """Parse a comma separated SHARD_WORKERS value."""
+    return [worker.strip() for worker in (value or "").split(",") if worker.strip()]
+
+
+def shard_save_file(save_file: str, worker: str) -> str:
+    """The per-worker variant of SAVE_FILE, e.g. `save_data.worker-1.json`."""
+    stem, ext = os.path.splitext(save_file)
+    return f"{stem}.{worker}{ext}"
+
+
+def load_peer_states(db_paths: Iterable[str], channel_names: Iterable[str]) -> Dict[str, bool]:
+    """
+    Read the last known live state of `channel_names` from other workers' state
+    databases, so channels that moved to this worker don't re-alert.
+    """
+    wanted = set(channel_names)
+    states: Dict[str, bool] = {}
+    for db_path in db_paths:
+        if not wanted or not os.path.exists(db_path):
+            continue
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                for name, live in conn.execute("SELECT name, live FROM channels"):
+                    if name in wanted:
+                        states[name] = bool(live)
+                        wanted.discard(name)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read peer state from {db_path}: {e}")
+    return states
+
+
+def load_json_states(json_path: str, channel_names: Iterable[str]) -> Dict[str, bool]:
+    """Read the last known live state of `channel_names` from a legacy JSON save file, without migrating it."""
+    wanted = set(channel_names)
+    if not wanted or not os.path.exists(json_path):
+        return {}
+    try:
+        with open(json_path, "r") as json_file:
+            data = json.load(json_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read legacy state from {json_path}: {e}")
+        return {}
+    return {entry["name"]: bool(entry.get("live")) for entry in data if entry.get("name") in wanted}
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import Dict, Iterable, List
+
+from twitch.channel import Channel
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    name TEXT PRIMARY KEY,
+    live INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+)
+"""
+STARTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS starts (
+    name TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    PRIMARY KEY (name, started_at)
+)
+"""
+
+
+class StateStore:
+    """
+    SQLite (WAL mode) store for the channel states.
+
+    `save()` only writes the channels whose live state changed since they were
+    last loaded or saved, in a single transaction, so a crash can never leave a
+    half-written state behind.
+
+    It also keeps the recent go-live times of every channel, which the poll
+    scheduler learns the usual start windows from.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # The server saves from a shutdown thread, so allow use across threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.execute(STARTS_SCHEMA)
+        self.conn.commit()
+        self._saved: Dict[str, bool] = {}  # Last persisted live state per channel
+
+    @staticmethod
+    def path_for(save_file: str) -> str:
+        """The database for `save_file`; a legacy JSON save file gets a `.db` next to it."""
+        stem, ext = os.path.splitext(save_file)
+        return f"{stem}.db" if ext.lower() == ".json" else save_file
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM channels").fetchone()[0]
+
+    def load(self) -> List[Channel]:
+        """Load every channel, in the order they were first added."""
+        rows = self.conn.execute("SELECT name, live FROM channels ORDER BY rowid").fetchall()
+        self._saved = {name: bool(live) for name, live in rows}
+        return [Channel(name, bool(live)) for name, live in rows]
+
+    def rows(self) -> List[dict]:
+        """Read every saved channel as plain data, without touching the change tracking."""
+        rows = self.conn.execute("SELECT name, live FROM channels ORDER BY rowid").fetchall()
+        return [{"name": name, "live": bool(live)} for name, live in rows]
+
+    def save(self, channels: Iterable[Channel]) -> int:
+        """
+        Write the channels that are new or whose live state changed.
+
+        Returns:
+            int: The number of channels written.
+        """
+        changed = [channel for channel in channels if self._saved.get(channel.name) != bool(channel.live)]
+        if not changed:
+            return 0
+
+        now = time.time()
+        with self.conn:  # One transaction: all rows are committed or none are
+            self.conn.executemany(
+                "INSERT INTO channels (name, live, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET live = excluded.live, updated_at = excluded.updated_at",
+                [(channel.name, int(bool(channel.live)), now) for channel in changed],
+            )
+        for channel in changed:
+            self._saved[channel.name] = bool(channel.live)
+        return len(changed)
+
+    def load_starts(self) -> Dict[str, List[float]]:
+        """The saved go-live times (epoch seconds) of every channel, oldest first."""
+        starts: Dict[str, List[float]] = {}
+        for name, started_at in self.conn.execute("SELECT name, started_at FROM starts ORDER BY name, started_at"):
+            starts.setdefault(name, []).append(started_at)
+        return starts
+
+    def save_start(self, name: str, started_at: float, keep: int = 10) -> None:
+        """Record that `name` went live at `started_at`, keeping only its `keep` latest go-live times."""
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO starts (name, started_at) VALUES (?, ?)", (name, started_at))
+            self.conn.execute(
+                "DELETE FROM starts WHERE name = ? AND started_at NOT IN "
+                "(SELECT started_at FROM starts WHERE name = ? ORDER BY started_at DESC LIMIT ?)",
+                (name, name, keep),
+            )
+
+    def remove(self, names: Iterable[str]) -> int:
+        """Delete channels, and their go-live times, from the store."""
+        names = list(names)
+        with self.conn:
+            self.conn.executemany("DELETE FROM channels WHERE name = ?", [(name,) for name in names])
+            self.conn.executemany("DELETE FROM starts WHERE name = ?", [(name,) for name in names])
+        for name in names:
+            self._saved.pop(name, None)
+        return len(names)
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        One-time import of a legacy JSON save file into an empty store.
+
+        The JSON file is renamed to `<name>.migrated` afterwards so it is never
+        imported twice.
+        """
+        if len(self) or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as json_file:
+                data = json.load(json_file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not migrate {json_path}, starting with an empty store: {e}")
+            return 0
+
+        migrated = self.save(Channel(channel_data["name"], channel_data["live"]) for channel_data in data)
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated {migrated} channels from {json_path} to {self.path}.")
+        return migrated
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_state_store(save_file: str) -> StateStore:
+    """Open the store for SAVE_FILE, migrating a legacy JSON save file on first use."""
+    store = StateStore(StateStore.path_for(save_file))
+    if store.path != save_file:
+        store.migrate_json(save_file)
+    return store
@@ -0,0 +1,73 @@
+import os
+import logging
+from typing import Optional, Tuple
+
+from twitch.lazy import optional_import
+
+logger = logging.getLogger(__name__)
+
+inotify_simple = optional_import("inotify_simple")  # Optional, and Linux only; loaded when a watcher uses it
+
+
+def inotify_available() -> bool:
+    """Check whether the optional `inotify_simple` package can be used."""
+    return inotify_simple is not None
+
+
+class FileWatcher:
+    """
+    Tells whether a file changed since the last call to `changed()`.
+
+    On Linux with `inotify_simple` installed the file's directory is watched with
+    inotify, so editors that save by writing a new file and renaming it over the
+    old one are noticed too. Otherwise, or if inotify can't be set up, the file's
+    modification time and size are compared on every call.
+
+    `changed()` never blocks, so it can be called between poll cycles.
+    """
+
+    def __init__(self, path: str, use_inotify: bool = True):
+        self.path = os.path.abspath(path)
+        self._signature = self._stat()
+        self._inotify = None
+        if use_inotify and inotify_available():
+            try:
+                self._inotify = inotify_simple.INotify()
+                self._inotify.add_watch(
+                    os.path.dirname(self.path),
+                    inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO | inotify_simple.flags.CREATE,
+                )
+            except OSError as e:
+                logger.warning(f"Could not watch {self.path} with inotify, checking its modification time instead: {e}")
+                self._inotify = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify else "mtime"
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        if self._inotify:
+            name = os.path.basename(self.path)
+            events = self._inotify.read(timeout=0)
+            if not any(event.name == name for event in events):
+                return False
+            self._signature = self._stat()
+            return True
+
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def close(self) -> None:
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None